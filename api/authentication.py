@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+TOKEN_VERSION_KEY = 'users:token-version:{pk}'
+TOKEN_VERSION_CLAIM = 'token_version'
+USER_CLAIMS = ('username', 'role', 'is_staff')
+
+
+def get_token_version(pk):
+    key = TOKEN_VERSION_KEY.format(pk=pk)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=pk, is_active=True).values_list(
+            'token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(pk):
+    cache.delete(TOKEN_VERSION_KEY.format(pk=pk))
+
+
+def load_user(user):
+    if isinstance(user, User):
+        return user
+    return get_object_or_404(User, pk=user.pk)
+
+
+class UserAccessToken(AccessToken):
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class ClaimsUser(TokenUser):
+
+    @property
+    def role(self):
+        return self.token.get('role', User.USER)
+
+    @property
+    def is_admin(self):
+        return self.role == User.ADMIN
+
+    @property
+    def is_moderator(self):
+        return self.role == User.MODERATOR
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        if get_token_version(user.pk) != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed(
+                'Токен отозван, получите новый', code='token_revoked')
+        return user
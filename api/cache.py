@@ -0,0 +1,145 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+VERSION_KEY = 'response-cache:{namespace}:version'
+MODIFIED_KEY = 'response-cache:{namespace}:modified'
+RESPONSE_KEY = 'response-cache:{namespace}:{version}:{digest}'
+STATS_KEY = 'response-cache:{namespace}:{event}'
+CACHED_METHODS = ('GET', 'HEAD')
+
+
+def get_state_timeout():
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return settings.RESPONSE_CACHE_TIMEOUT
+    return None
+
+
+def get_state(namespace):
+    version_key = VERSION_KEY.format(namespace=namespace)
+    modified_key = MODIFIED_KEY.format(namespace=namespace)
+    state = cache.get_many([version_key, modified_key])
+    now = time.time()
+    timeout = get_state_timeout()
+    version = state.get(version_key)
+    modified = state.get(modified_key)
+    if version is None:
+        version = int(now * 1000)
+        if cache.add(version_key, version, timeout):
+            modified = int(now)
+            cache.set(modified_key, modified, timeout)
+        else:
+            version = cache.get(version_key, version)
+    if modified is None:
+        modified = int(now)
+        cache.add(modified_key, modified, timeout)
+    return version, modified
+
+
+def invalidate(*namespaces):
+    modified = int(time.time())
+    timeout = get_state_timeout()
+    for namespace in namespaces:
+        try:
+            cache.incr(VERSION_KEY.format(namespace=namespace))
+        except ValueError:
+            pass
+        cache.set(
+            MODIFIED_KEY.format(namespace=namespace), modified, timeout)
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_stats(namespaces):
+    keys = {
+        (namespace, event): STATS_KEY.format(
+            namespace=namespace, event=event)
+        for namespace in namespaces
+        for event in ('hits', 'misses')
+    }
+    values = cache.get_many(keys.values())
+    stats = {namespace: {} for namespace in namespaces}
+    for (namespace, event), key in keys.items():
+        stats[namespace][event] = values.get(key, 0)
+    return stats
+
+
+def get_request_digest(request):
+    query = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    return hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+
+
+class CachedResponseMixin:
+    cache_namespace = None
+
+    def get_cached_response(self, handler, request, *args,
+                            lookup_first=False, **kwargs):
+        if request.method not in CACHED_METHODS:
+            return handler(request, *args, **kwargs)
+        version, modified = get_state(self.cache_namespace)
+        digest = get_request_digest(request)
+        etag = quote_etag(hashlib.md5(
+            f'{version}:{digest}:{request.accepted_renderer.format}'
+            .encode()).hexdigest())
+        response = None
+        if not lookup_first:
+            response = get_conditional_response(
+                request._request, etag=etag, last_modified=modified)
+        if response is None:
+            response = self.get_shared_response(
+                handler, request, version, digest, *args, **kwargs)
+            if lookup_first and response.status_code == 200:
+                response = get_conditional_response(
+                    request._request, etag=etag, last_modified=modified,
+                    response=response)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(modified)
+        return response
+
+    def get_shared_response(self, handler, request, version, digest,
+                            *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = RESPONSE_KEY.format(
+            namespace=self.cache_namespace, version=version, digest=digest)
+        data = cache.get(key)
+        if data is not None:
+            increment(STATS_KEY.format(
+                namespace=self.cache_namespace, event='hits'))
+            return Response(data)
+        increment(STATS_KEY.format(
+            namespace=self.cache_namespace, event='misses'))
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, lookup_first=True, **kwargs)
@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+from titles.models import Category, Genre
+
+from .cache import get_state
+
+CatalogState = namedtuple(
+    'CatalogState', ('version', 'indexes', 'representations'))
+
+
+class Catalog:
+
+    def __init__(self, model, namespace, fields=('pk', 'slug')):
+        self.model = model
+        self.namespace = namespace
+        self.fields = fields
+        self.state = CatalogState(None, {}, {})
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def load(self, version):
+        objects = list(self.model.objects.all())
+        self.state = CatalogState(
+            version,
+            {
+                field: {getattr(obj, field): obj for obj in objects}
+                for field in self.fields
+            },
+            {},
+        )
+        return self.state
+
+    def get_current(self):
+        version, _ = get_state(self.namespace)
+        if self.state.version != version:
+            return self.load(version)
+        return self.state
+
+    def in_bulk(self, values, field_name='pk'):
+        state = self.get_current()
+        index = state.indexes[field_name]
+        if any(value not in index for value in values):
+            index = self.load(state.version).indexes[field_name]
+        return {value: index[value] for value in values if value in index}
+
+    def represent(self, pk, serializer_class, state=None):
+        key = serializer_class, pk
+        if state is None:
+            state = self.get_current()
+        if key not in state.representations:
+            obj = state.indexes['pk'].get(pk)
+            if obj is None:
+                obj = self.in_bulk([pk]).get(pk)
+                if obj is None:
+                    return None
+                state = self.state
+            state.representations[key] = dict(serializer_class(obj).data)
+        return dict(state.representations[key])
+
+
+categories = Catalog(Category, 'categories')
+genres = Catalog(Genre, 'genres')
@@ -0,0 +1,71 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from titles.models import Comment, Review, Title
+
+DATASETS = {
+    'titles': (
+        Title,
+        ('id', 'name', 'year', 'category', 'rating'),
+        ('id', 'name', 'year', 'category_id', 'rating'),
+    ),
+    'reviews': (
+        Review,
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        ('id', 'title_id', 'text', 'author_id', 'score', 'pub_date'),
+    ),
+    'comments': (
+        Comment,
+        ('id', 'review_id', 'text', 'author', 'pub_date'),
+        ('id', 'review_id', 'text', 'author_id', 'pub_date'),
+    ),
+}
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def get_rows(dataset, chunk_size):
+    model, _, fields = DATASETS[dataset]
+    queryset = model.objects.order_by('pk').values_list(*fields)
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def format_ndjson(columns, row, encoder):
+    return encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def format_csv(columns, row, encoder, writer=csv.writer(Echo())):
+    return writer.writerow([
+        '' if value is None
+        else value if isinstance(value, (str, int, float))
+        else encoder.default(value)
+        for value in row
+    ])
+
+
+def export(dataset, output='ndjson', chunk_size=DEFAULT_CHUNK_SIZE):
+    columns = DATASETS[dataset][1]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    if output == 'csv':
+        formatter = format_csv
+        yield format_csv(columns, columns, encoder)
+    else:
+        formatter = format_ndjson
+    lines = []
+    for row in get_rows(dataset, chunk_size):
+        lines.append(formatter(columns, row, encoder))
+        if len(lines) == chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
@@ -2,18 +2,34 @@ from django_filters import rest_framework as filters
 
 from titles.models import Title
 
+from .catalog import categories, genres
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
+
 
 class TitlesFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='contains')
-    category = filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='contains'
-    )
-    genre = filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='contains'
-    )
+    name = filters.CharFilter(field_name='name', lookup_expr='icontains')
+    category = filters.CharFilter(method='filter_category')
+    genre = CharInFilter(method='filter_genre')
 
     class Meta:
         model = Title
         fields = ['name', 'genre', 'category', 'year']
+
+    def filter_category(self, queryset, name, value):
+        category = categories.in_bulk([value], field_name='slug').get(value)
+        if category is None:
+            return queryset.none()
+        return queryset.filter(category_id=category.pk)
+
+    def filter_genre(self, queryset, name, value):
+        genre_ids = [
+            genre.pk
+            for genre in genres.in_bulk(value, field_name='slug').values()
+        ]
+        return queryset.filter(
+            id__in=Title.genre.through.objects.filter(
+                genre_id__in=genre_ids).values('title_id')
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.export import CONTENT_TYPES, DATASETS, DEFAULT_CHUNK_SIZE, export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает произведения, отзывы или комментарии в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument(
+            '--output', choices=CONTENT_TYPES, default='ndjson',
+            help='Формат выгрузки')
+        parser.add_argument(
+            '--file', help='Файл для записи, по умолчанию стандартный вывод')
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Количество строк, читаемых из базы за один раз')
+
+    def handle(self, *args, **options):
+        chunks = export(
+            options['dataset'], options['output'], options['chunk_size'])
+        if options['file'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', encoding='utf-8', newline='') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка {options["dataset"]} записана в {options["file"]}'))
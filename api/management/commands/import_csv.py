@@ -0,0 +1,199 @@
+import csv
+import io
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from api.cache import invalidate
+from titles.models import Category, Comment, Genre, Review, ScoreBucket, Title
+
+User = get_user_model()
+
+SOURCES = (
+    ('users.csv', User, {'description': 'bio'}),
+    ('category.csv', Category, {}),
+    ('genre.csv', Genre, {}),
+    ('titles.csv', Title, {'category': 'category_id'}),
+    ('genre_title.csv', Title.genre.through, {}),
+    ('review.csv', Review, {'author': 'author_id'}),
+    ('comments.csv', Comment, {'author': 'author_id'}),
+)
+NULL = '\\N'
+
+
+@contextmanager
+def keep_auto_now_add(model):
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Загружает данные из CSV-файлов каталога data/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=os.path.join(settings.BASE_DIR, 'data'),
+            help='Каталог с CSV-файлами')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одной пачке')
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy'])
+        self.known_ids = {}
+        sources = [
+            (os.path.join(options['path'], name), model, renames)
+            for name, model, renames in SOURCES
+        ]
+        for path, _, _ in sources:
+            if not os.path.exists(path):
+                raise CommandError(f'Файл {path} не найден')
+        with transaction.atomic():
+            for path, model, renames in sources:
+                self.import_file(path, model, renames)
+            self.reset_sequences([model for _, model, _ in sources])
+        Title.objects.recalculate_ratings()
+        ScoreBucket.objects.rebuild()
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('refresh_rankings', stdout=self.stdout)
+        invalidate('categories', 'genres', 'titles')
+
+    def import_file(self, path, model, renames):
+        started = time.monotonic()
+        imported = skipped = 0
+        with open(path, encoding='utf-8', newline='') as source:
+            rows = csv.DictReader(source)
+            fields = [
+                model._meta.get_field(renames.get(column, column))
+                for column in rows.fieldnames
+            ]
+            checks = [
+                (field.attname, self.get_known_ids(field.related_model))
+                for field in fields if field.is_relation
+            ]
+            unique_sets = self.get_unique_sets(model)
+            while True:
+                batch = []
+                for row in islice(rows, self.batch_size):
+                    values = {
+                        field.attname: self.to_python(field, value)
+                        for field, value in zip(fields, row.values())
+                    }
+                    if self.is_valid(values, checks, unique_sets):
+                        batch.append(self.build(model, values))
+                    else:
+                        skipped += 1
+                if not batch:
+                    break
+                self.insert(model, batch)
+                imported += len(batch)
+        self.known_ids.pop(model, None)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'{os.path.basename(path)}: загружено {imported}, '
+            f'пропущено {skipped}, {imported / elapsed:.0f} строк/с')
+
+    def get_known_ids(self, model):
+        if model not in self.known_ids:
+            self.known_ids[model] = set(
+                model.objects.values_list('pk', flat=True))
+        return self.known_ids[model]
+
+    def get_unique_sets(self, model):
+        opts = model._meta
+        field_sets = [
+            (field.name,) for field in opts.concrete_fields if field.unique
+        ]
+        field_sets.extend(opts.unique_together)
+        field_sets.extend(
+            constraint.fields for constraint in opts.constraints
+            if getattr(constraint, 'fields', None)
+            and getattr(constraint, 'condition', None) is None
+        )
+        unique_sets = []
+        for names in field_sets:
+            attnames = tuple(opts.get_field(name).attname for name in names)
+            seen = set(model.objects.values_list(*attnames))
+            unique_sets.append((attnames, seen))
+        return unique_sets
+
+    def is_valid(self, values, checks, unique_sets):
+        if not all(
+            values[name] is None or values[name] in ids
+            for name, ids in checks
+        ):
+            return False
+        keys = [
+            (tuple(values.get(name) for name in attnames), seen)
+            for attnames, seen in unique_sets
+        ]
+        if any(None not in key and key in seen for key, seen in keys):
+            return False
+        for key, seen in keys:
+            seen.add(key)
+        return True
+
+    def to_python(self, field, value):
+        if value == '' and field.null:
+            return None
+        return field.to_python(value)
+
+    def build(self, model, values):
+        instance = model(**values)
+        if model is User:
+            instance.password = make_password(None)
+        return instance
+
+    def insert(self, model, batch):
+        if not self.use_copy:
+            with keep_auto_now_add(model):
+                model.objects.bulk_create(batch)
+            return
+        fields = model._meta.concrete_fields
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for instance in batch:
+            row = []
+            for field in fields:
+                value = field.get_db_prep_save(
+                    getattr(instance, field.attname), connection)
+                row.append(NULL if value is None else value)
+            writer.writerow(row)
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f"({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')",
+                buffer,
+            )
+
+    def reset_sequences(self, models):
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
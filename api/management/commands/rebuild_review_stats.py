@@ -0,0 +1,60 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api.cache import invalidate
+from titles.models import Review, ScoreBucket, Title
+
+
+class Command(BaseCommand):
+    help = ('Проверяет и пересобирает количество отзывов и гистограммы '
+            'оценок произведений')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только сообщить о расхождениях, ничего не меняя')
+
+    def find_mismatches(self):
+        expected = {
+            (row['title_id'], row['score']): row['total']
+            for row in Review.objects.order_by().values(
+                'title_id', 'score').annotate(total=Count('pk'))
+        }
+        stored = {
+            (title_id, score): count
+            for title_id, score, count in ScoreBucket.objects.exclude(
+                count=0).values_list('title_id', 'score', 'count')
+        }
+        title_ids = {key[0] for key in expected.keys() ^ stored.keys()}
+        title_ids.update(
+            key[0] for key in expected.keys() & stored.keys()
+            if expected[key] != stored[key]
+        )
+        counts = Counter()
+        for (title_id, _), total in expected.items():
+            counts[title_id] += total
+        title_ids.update(
+            pk for pk, rating_count in Title.objects.values_list(
+                'pk', 'rating_count')
+            if counts[pk] != rating_count
+        )
+        return sorted(title_ids)
+
+    def handle(self, *args, **options):
+        mismatches = self.find_mismatches()
+        if options['check']:
+            if mismatches:
+                raise CommandError(
+                    'Статистика отзывов расходится у произведений: '
+                    + ', '.join(map(str, mismatches)))
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        Title.objects.recalculate_ratings()
+        ScoreBucket.objects.rebuild()
+        if mismatches:
+            invalidate('titles')
+        self.stdout.write(self.style.SUCCESS(
+            f'Статистика отзывов пересобрана, исправлено произведений: '
+            f'{len(mismatches)}'))
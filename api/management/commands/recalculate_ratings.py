@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate
+from titles.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинги произведений по сохранённым отзывам'
+
+    def handle(self, *args, **options):
+        updated = Title.objects.recalculate_ratings()
+        if updated:
+            invalidate('titles')
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано произведений: {updated}'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate
+from titles.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = ('Обновляет рейтинги для /api/v1/titles/top/ и '
+            '/api/v1/titles/trending/')
+
+    def handle(self, *args, **options):
+        bayesian, trending = refresh_rankings()
+        if bayesian or trending:
+            invalidate('titles')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено мест в рейтинге: {bayesian}, '
+            f'в популярном: {trending}'))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import connection
+
+
+class QueryCountMiddleware:
+    header = 'X-Query-Count'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DEBUG:
+            return self.get_response(request)
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        response[self.header] = len(queries)
+        return response
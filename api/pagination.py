@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class OptionalCountPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    count_by_default = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.max_page_size = getattr(view, 'max_page_size', self.max_page_size)
+        self.without_count = request.query_params.get(
+            self.count_query_param, str(self.count_by_default)
+        ).lower() in ('false', '0')
+        if not self.without_count:
+            return super().paginate_queryset(queryset, request, view)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        self.page_number = self.get_page_number_without_count(request)
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and self.page_number != 1:
+            raise NotFound(self.invalid_page_message)
+        self.has_next = len(rows) > page_size
+        self.display_page_controls = False
+        return rows[:page_size]
+
+    def get_page_number_without_count(self, request):
+        try:
+            page_number = int(
+                request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message)
+        return page_number
+
+    def get_paginated_response(self, data):
+        if not self.without_count:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.without_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if not self.without_count:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1)
+
+
+class RankingPagination(OptionalCountPagination):
+    count_by_default = False
+
+
+class CursorOrPageNumberPagination(OptionalCountPagination):
+    cursor_query_param = 'cursor'
+    ordering = '-id'
+
+    def get_cursor_paginator(self):
+        paginator = CursorPagination()
+        paginator.cursor_query_param = self.cursor_query_param
+        paginator.ordering = self.ordering
+        paginator.page_size = self.page_size
+        paginator.page_size_query_param = self.page_size_query_param
+        paginator.max_page_size = self.max_page_size
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.max_page_size = getattr(view, 'max_page_size', self.max_page_size)
+        self.cursor_paginator = self.get_cursor_paginator()
+        page = self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+        self.display_page_controls = (
+            self.cursor_paginator.display_page_controls)
+        return page
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+
+class TitlePagination(CursorOrPageNumberPagination):
+    ordering = '-id'
+
+
+class PubDatePagination(CursorOrPageNumberPagination):
+    ordering = ('-pub_date', '-id')
@@ -17,18 +17,15 @@ class IsAuthorOrAdminOrModerator(BasePermission):
             and request.user.is_authenticated)
 
     def has_object_permission(self, request, view, obj):
-        if request.user and request.user.is_authenticated:
-            if (
-                request.user.is_staff
-                or request.user.is_admin
-                or request.user.is_moderator
-                or obj.author == request.user
-                or request.method == 'POST'
-                and request.user.is_authenticated
-            ):
-                return True
-        elif request.method in SAFE_METHODS:
+        if request.method in SAFE_METHODS:
             return True
+        user = request.user
+        return (
+            obj.author_id == user.pk
+            or user.is_staff
+            or user.is_admin
+            or user.is_moderator
+        )
 
 
 class IsAdminOrReadOnly(BasePermission):
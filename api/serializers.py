@@ -1,9 +1,23 @@
+from functools import partial
+from operator import itemgetter
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers, status
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.settings import api_settings
+
+from titles.models import (
+    UNCONFIRMED_USER, Category, Comment, ConfirmationCode, Genre, Review,
+    Title,
+)
+from titles.search import index_titles
 
-from titles.models import Category, Comment, Genre, Review, Title
+from .authentication import UserAccessToken
+from .cache import invalidate
+from .catalog import categories, genres
 
 User = get_user_model()
 
@@ -31,9 +45,11 @@ class SendConfirmationCodeSerializer(serializers.ModelSerializer):
         fields = ('email',)
 
     def validate_email(self, email):
-        if User.objects.filter(email=email).exists():
+        users = User.objects.filter(email=email, is_active=False).exclude(
+            UNCONFIRMED_USER)
+        if users.exists():
             raise serializers.ValidationError(
-                {'detail': 'Пользователь с таким email уже есть в нашей базе'})
+                {'detail': 'Пользователь с таким email заблокирован'})
         return email
 
 
@@ -44,17 +60,21 @@ class СheckingConfirmationCodeSerializer(serializers.Serializer):
     def validate(self, data):
         email = data.get('email')
         confirmation_code = data.get('confirmation_code')
-        user = get_object_or_404(
-            User,
-            email=email,
-            password=confirmation_code,
-            is_active=True)
-        if user is None:
+        user = User.objects.filter(email=email).first()
+        if (
+            user is None
+            or not user.is_active and user.confirmed_at is not None
+            or not ConfirmationCode.objects.verify(email, confirmation_code)
+        ):
             raise serializers.ValidationError(
                 {
                     'detail': 'Такого пользователя нет или неверный код '
                     'подтверждения или email'})
-        token = {'token': str(AccessToken.for_user(user))}
+        if user.confirmed_at is None:
+            user.is_active = True
+            user.confirmed_at = timezone.now()
+            user.save(update_fields=['is_active', 'confirmed_at'])
+        token = {'token': str(UserAccessToken.for_user(user))}
         return token
 
 
@@ -80,23 +100,308 @@ class GenreField(serializers.SlugRelatedField):
         return GenreSerializer(value).data
 
 
+class SavedManyRelatedField(serializers.ManyRelatedField):
+
+    def get_attribute(self, instance):
+        saved = self.context.get('saved_relations') or {}
+        if self.field_name in saved:
+            return sorted(saved[self.field_name], key=lambda obj: -obj.pk)
+        return super().get_attribute(instance)
+
+
+class CatalogField(serializers.RelatedField):
+
+    def __init__(self, catalog, serializer_class, **kwargs):
+        self.catalog = catalog
+        self.serializer_class = serializer_class
+        self.catalog_state = None
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SavedManyRelatedField(**list_kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_representation(self, value):
+        if self.catalog_state is None:
+            self.catalog_state = self.catalog.get_current()
+        return self.catalog.represent(
+            value.pk, self.serializer_class, self.catalog_state)
+
+
 class TitleReadSerializer(serializers.ModelSerializer):
-    genre = GenreSerializer(read_only=True, many=True)
-    category = CategorySerializer(read_only=True)
+    genre = CatalogField(genres, GenreSerializer, read_only=True, many=True)
+    category = CatalogField(categories, CategorySerializer, read_only=True)
     rating = serializers.FloatField(read_only=True)
 
     class Meta:
-        fields = '__all__'
+        exclude = ('rating_sum', 'rating_count')
         model = Title
 
 
+class TitleSearchSerializer(TitleReadSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+
+class TitleStatsSerializer(TitleReadSerializer):
+    reviews_count = serializers.IntegerField(
+        source='rating_count', read_only=True)
+    score_histogram = serializers.SerializerMethodField()
+
+    def get_score_histogram(self, title):
+        histogram = {str(score): 0 for score in range(1, 11)}
+        for bucket in title.score_buckets.all():
+            histogram[str(bucket.score)] = bucket.count
+        return histogram
+
+
+class TitleListSerializer:
+    serializer_class = TitleReadSerializer
+    related_fields = ('genre', 'category')
+    accessors = None
+
+    def __init__(self, instance=None, many=True, context=None, **kwargs):
+        self.instance = instance
+
+    @classmethod
+    def compile(cls):
+        if cls.accessors is None:
+            cls.accessors = [
+                (name, None) if name in cls.related_fields
+                else (name, itemgetter(name))
+                for name in cls.serializer_class().fields
+            ]
+        return cls.accessors
+
+    @classmethod
+    def get_columns(cls):
+        return [
+            name for name, getter in cls.compile() if getter is not None
+        ] + ['category_id']
+
+    def get_genre_ids(self, title_ids):
+        genre_ids = {title_id: [] for title_id in title_ids}
+        rows = Title.genre.through.objects.filter(
+            title_id__in=title_ids
+        ).order_by('-genre_id').values_list('title_id', 'genre_id')
+        for title_id, genre_id in rows:
+            genre_ids[title_id].append(genre_id)
+        return genre_ids
+
+    @property
+    def data(self):
+        rows = list(self.instance)
+        genre_ids = self.get_genre_ids([row['id'] for row in rows])
+        genre_state = genres.get_current()
+        category_state = categories.get_current()
+
+        def get_genre(row):
+            return [
+                genres.represent(pk, GenreSerializer, genre_state)
+                for pk in genre_ids[row['id']]
+            ]
+
+        def get_category(row):
+            if row['category_id'] is None:
+                return None
+            return categories.represent(
+                row['category_id'], CategorySerializer, category_state)
+
+        related = {'genre': get_genre, 'category': get_category}
+        accessors = [
+            (name, getter or related[name]) for name, getter in self.compile()
+        ]
+        return [
+            {name: getter(row) for name, getter in accessors} for row in rows
+        ]
+
+
+class SlugManyRelatedField(serializers.ManyRelatedField):
+    default_error_messages = {
+        'does_not_exist': 'Объектов со значениями {slug_name} {values} '
+                          'не существует',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        relation = self.child_relation
+        values = list(dict.fromkeys(str(value) for value in data))
+        objects = relation.get_objects(values)
+        missing = [value for value in values if value not in objects]
+        if missing:
+            self.fail(
+                'does_not_exist',
+                slug_name=relation.slug_field,
+                values=', '.join(missing))
+        return [objects[value] for value in values]
+
+
+class CatalogSlugRelatedField(serializers.SlugRelatedField):
+
+    def __init__(self, catalog, **kwargs):
+        self.catalog = catalog
+        kwargs.setdefault('slug_field', 'slug')
+        kwargs.setdefault('queryset', catalog.model.objects.all())
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SlugManyRelatedField(**list_kwargs)
+
+    def get_objects(self, values):
+        return self.catalog.in_bulk(values, field_name=self.slug_field)
+
+    def to_internal_value(self, data):
+        value = str(data)
+        obj = self.get_objects([value]).get(value)
+        if obj is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=value)
+        return obj
+
+
 class TitleWriteSerializer(TitleReadSerializer):
-    genre = serializers.SlugRelatedField(
-        queryset=Genre.objects.all(), slug_field='slug', many=True
-    )
-    category = serializers.SlugRelatedField(
-        queryset=Category.objects.all(), slug_field='slug'
-    )
+    genre = CatalogSlugRelatedField(genres, many=True)
+    category = CatalogSlugRelatedField(categories)
+
+    saved_relations = None
+
+    def create(self, validated_data):
+        self.remember_genres(validated_data)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        self.remember_genres(validated_data)
+        return super().update(instance, validated_data)
+
+    def remember_genres(self, validated_data):
+        if 'genre' in validated_data:
+            self.saved_relations = {'genre': validated_data['genre']}
+
+    def to_representation(self, instance):
+        context = dict(self.context, saved_relations=self.saved_relations)
+        return TitleReadSerializer(instance, context=context).data
+
+
+class TitleBulkListSerializer(serializers.ListSerializer):
+    default_error_messages = {
+        'too_many': 'Нельзя создать больше {max_size} произведений за раз',
+        'unknown_category': 'Категории {slug} не существует',
+        'unknown_genre': 'Жанров {slugs} не существует',
+        'name_exists': 'Произведение с таким названием уже существует',
+        'name_repeated': 'Название повторяется в запросе',
+    }
+
+    def fail_list(self, key, **kwargs):
+        message = self.error_messages[key].format(**kwargs)
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [message]}, code=key)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            self.fail_list('not_a_list', input_type=type(data).__name__)
+        if not data:
+            self.fail_list('empty')
+        if len(data) > settings.TITLES_BULK_MAX_SIZE:
+            self.fail_list('too_many', max_size=settings.TITLES_BULK_MAX_SIZE)
+
+        items, errors = [], []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+        self.resolve_references(items, errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def resolve_references(self, items, errors):
+        valid = [item for item in items if item is not None]
+        category_objects = categories.in_bulk(
+            {item['category'] for item in valid}, field_name='slug')
+        genre_objects = genres.in_bulk(
+            {slug for item in valid for slug in item['genre']},
+            field_name='slug')
+        existing = set(Title.objects.filter(
+            name__in=[item['name'] for item in valid]
+        ).values_list('name', flat=True))
+
+        seen = set()
+        for item, error in zip(items, errors):
+            if item is None:
+                continue
+            if item['name'] in existing:
+                error['name'] = [self.error_messages['name_exists']]
+            elif item['name'] in seen:
+                error['name'] = [self.error_messages['name_repeated']]
+            seen.add(item['name'])
+            category = category_objects.get(item['category'])
+            if category is None:
+                error['category'] = [
+                    self.error_messages['unknown_category'].format(
+                        slug=item['category'])]
+            missing = [
+                slug for slug in item['genre'] if slug not in genre_objects]
+            if missing:
+                error['genre'] = [self.error_messages['unknown_genre'].format(
+                    slugs=', '.join(missing))]
+            if not error:
+                item['category'] = category
+                item['genre'] = [
+                    genre_objects[slug] for slug in item['genre']]
+
+    def create(self, validated_data):
+        titles = [
+            Title(**{
+                key: value for key, value in item.items() if key != 'genre'
+            })
+            for item in validated_data
+        ]
+        with transaction.atomic():
+            Title.objects.bulk_create(titles)
+            if any(title.pk is None for title in titles):
+                ids = dict(Title.objects.filter(
+                    name__in=[title.name for title in titles]
+                ).values_list('name', 'pk'))
+                for title in titles:
+                    title.pk = ids[title.name]
+            Title.genre.through.objects.bulk_create([
+                Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+                for title, item in zip(titles, validated_data)
+                for genre in dict.fromkeys(item['genre'])
+            ])
+            ids = [title.pk for title in titles]
+            transaction.on_commit(partial(index_titles, ids))
+            transaction.on_commit(partial(invalidate, 'titles'))
+        created = Title.objects.with_genre_ids().in_bulk(ids)
+        return [created[pk] for pk in ids]
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(max_length=100)
+    genre = serializers.ListField(
+        child=serializers.SlugField(max_length=40))
+    category = serializers.SlugField(max_length=40)
+
+    class Meta:
+        model = Title
+        fields = ('name', 'year', 'description', 'genre', 'category')
+        list_serializer_class = TitleBulkListSerializer
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -115,7 +420,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         if request_method == 'POST':
             author = self.context.get('request').user
             title_id = self.context.get('view').kwargs.get('title_id')
-            reviews = author.reviews.all()
+            reviews = Review.objects.filter(author_id=author.pk)
             if reviews.filter(title_id=title_id).exists():
                 raise serializers.ValidationError(
                     detail='Вы уже делали ревью на это произведение!',
@@ -0,0 +1,60 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save,
+)
+
+from titles.models import Category, Genre, Review, Title
+
+from .authentication import USER_CLAIMS, forget_token_version
+from .cache import invalidate
+
+User = get_user_model()
+
+CACHE_NAMESPACES = {
+    Category: ('categories', 'titles'),
+    Genre: ('genres', 'titles'),
+    Title: ('titles',),
+    Title.genre.through: ('titles',),
+    Review: ('titles',),
+}
+
+
+def invalidate_response_cache(sender, action='post_save', **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(
+            partial(invalidate, *CACHE_NAMESPACES[sender]))
+
+
+for model in (Category, Genre, Title, Review):
+    post_save.connect(invalidate_response_cache, sender=model)
+    post_delete.connect(invalidate_response_cache, sender=model)
+m2m_changed.connect(
+    invalidate_response_cache, sender=Title.genre.through)
+
+
+def revoke_tokens(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    fields = USER_CLAIMS + ('is_active', 'token_version')
+    current = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    if current is None or all(
+        current[field] == getattr(instance, field)
+        for field in fields[:-1]
+    ):
+        return
+    sender.objects.filter(pk=instance.pk).update(
+        token_version=F('token_version') + 1)
+    instance.token_version = current['token_version'] + 1
+    transaction.on_commit(partial(forget_token_version, instance.pk))
+
+
+def forget_deleted_user(sender, instance, **kwargs):
+    transaction.on_commit(partial(forget_token_version, instance.pk))
+
+
+pre_save.connect(revoke_tokens, sender=User)
+post_delete.connect(forget_deleted_user, sender=User)
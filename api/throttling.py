@@ -0,0 +1,47 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+
+class CacheScopedRateThrottle(ScopedRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s:%(window)s'
+    throttled_methods = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'No default throttle rate set for {self.scope!r} scope')
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope or request.method not in self.throttled_methods:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.now = self.timer()
+        self.key = self.get_cache_key(request, view)
+        return self.increment(self.key) <= self.num_requests
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': ident,
+            'window': int(self.now // self.duration),
+        }
+
+    def increment(self, key):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            if self.cache.add(key, 1, self.duration):
+                return 1
+            return self.cache.incr(key)
+
+    def wait(self):
+        return self.duration - self.now % self.duration
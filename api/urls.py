@@ -2,8 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
-    CategoryViewSet, CommentViewSet, GenreViewSet, GetJWTTokenViewSet,
-    ReviewViewSet, SendConfirmationCodeViewSet, TitleViewSet, UserViewSet,
+    CacheStatsView, CategoryViewSet, CommentViewSet, ExportView, GenreViewSet,
+    GetJWTTokenViewSet, ReviewViewSet, SearchViewSet,
+    SendConfirmationCodeViewSet, TitleViewSet, UserViewSet,
 )
 
 v1_router = DefaultRouter()
@@ -28,6 +29,11 @@ v1_router.register(
     GenreViewSet,
     basename='genre',
 )
+v1_router.register(
+    'search',
+    SearchViewSet,
+    basename='search',
+)
 
 urlpatterns = [
     path('v1/', include(v1_router.urls)),
@@ -36,4 +42,9 @@ urlpatterns = [
         SendConfirmationCodeViewSet.as_view(),
         name='send_confirmation_code'),
     path('v1/auth/token/', GetJWTTokenViewSet.as_view(), name='get_jwt_token'),
+    path('v1/cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path(
+        'v1/export/<slug:dataset>/',
+        ExportView.as_view(),
+        name='export'),
 ]
@@ -1,27 +1,41 @@
-import secrets
-
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, generics, mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from titles.models import Category, Genre, Review, Title
+from titles.models import (
+    Category, Comment, ConfirmationCode, EmailOutbox, Genre, Review, Title,
+)
+from titles.search import search_titles
 
+from .authentication import load_user
+from .cache import CachedListMixin, CachedRetrieveMixin, get_stats
+from .export import CONTENT_TYPES, DATASETS, export
 from .filters import TitlesFilter
+from .pagination import (
+    OptionalCountPagination, PubDatePagination, RankingPagination,
+    TitlePagination,
+)
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsAuthorOrAdminOrModerator
 from .serializers import (
     CategorySerializer, CommentSerializer, ForAdminSerializer,
     ForUserSerializer, GenreSerializer, ReviewSerializer,
-    SendConfirmationCodeSerializer, TitleReadSerializer, TitleWriteSerializer,
-    СheckingConfirmationCodeSerializer,
+    SendConfirmationCodeSerializer, TitleBulkSerializer, TitleListSerializer,
+    TitleReadSerializer, TitleSearchSerializer, TitleStatsSerializer,
+    TitleWriteSerializer, СheckingConfirmationCodeSerializer,
 )
 
 User = get_user_model()
@@ -30,26 +44,28 @@ User = get_user_model()
 class SendConfirmationCodeViewSet(generics.CreateAPIView):
     serializer_class = SendConfirmationCodeSerializer
     queryset = User.objects.all()
+    throttle_scope = 'confirmation-email'
 
+    @transaction.atomic
     def perform_create(self, serializer):
         email = serializer.validated_data['email']
         username = email.split('@')[0]
-        confirmation_code = secrets.token_urlsafe(15)
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            user = serializer.save(
+                username=username, email=email, is_active=False,
+                confirmed_at=None, password=make_password(None))
+        confirmation_code = ConfirmationCode.objects.issue(email)
         subject = 'Код подтверждения на Yamdb'
         message = f'Ваш код подтверждения: {confirmation_code}'
-        send_mail(
-            subject,
-            message,
-            settings.EMAIL_ADMIN,
-            [email],
-            fail_silently=False)
-
-        return serializer.save(
-            username=username, password=confirmation_code, email=email)
+        EmailOutbox.objects.enqueue(
+            subject, message, settings.EMAIL_ADMIN, email)
+        return user
 
 
 class GetJWTTokenViewSet(TokenObtainPairView):
     serializer_class = СheckingConfirmationCodeSerializer
+    throttle_scope = 'token'
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -57,20 +73,22 @@ class UserViewSet(viewsets.ModelViewSet):
     lookup_field = 'username'
     queryset = User.objects.all()
     permission_classes = [IsAdmin]
+    pagination_class = OptionalCountPagination
+    max_page_size = 50
 
     @action(
         methods=['GET', 'PATCH'],
         detail=False,
         permission_classes=[IsAuthenticated])
     def me(self, request, pk=None):
-        user = self.request.user
+        user = load_user(request.user)
         if request.method == 'PATCH':
             serializer = ForUserSerializer(
                 user, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
-        serializer = ForUserSerializer(self.request.user)
+        serializer = ForUserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -83,7 +101,8 @@ class CustomViewSet(
     pass
 
 
-class CategoryViewSet(CustomViewSet):
+class CategoryViewSet(CachedListMixin, CustomViewSet):
+    cache_namespace = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     pagination_class = PageNumberPagination
@@ -93,7 +112,8 @@ class CategoryViewSet(CustomViewSet):
     lookup_field = 'slug'
 
 
-class GenreViewSet(CustomViewSet):
+class GenreViewSet(CachedListMixin, CustomViewSet):
+    cache_namespace = 'genres'
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     pagination_class = PageNumberPagination
@@ -103,62 +123,157 @@ class GenreViewSet(CustomViewSet):
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).order_by('-id')
-    pagination_class = PageNumberPagination
+class TitleViewSet(
+    CachedListMixin, CachedRetrieveMixin, viewsets.ModelViewSet
+):
+    cache_namespace = 'titles'
+    queryset = Title.objects.with_genre_ids().order_by('-id')
+    pagination_class = TitlePagination
+    max_page_size = 100
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitlesFilter
 
+    rankings = {
+        'top': (Q(), ('-ranking__bayesian', '-id')),
+        'trending': (
+            Q(ranking__trending__gt=0),
+            ('-ranking__trending', '-ranking__bayesian', '-id'),
+        ),
+    }
+
+    def include_stats(self):
+        include = self.request.query_params.get('include', '')
+        return self.action == 'retrieve' and 'stats' in include.split(',')
+
+    def get_queryset(self):
+        if self.action in self.rankings:
+            condition, ordering = self.rankings[self.action]
+            return Title.objects.filter(
+                condition, ranking__isnull=False
+            ).order_by(*ordering).values(*TitleListSerializer.get_columns())
+        if self.action == 'list':
+            return Title.objects.order_by('-id').values(
+                *TitleListSerializer.get_columns())
+        if self.include_stats():
+            return super().get_queryset().prefetch_related('score_buckets')
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.request.method in ['POST', 'PATCH']:
             return TitleWriteSerializer
+        if self.action == 'list' or self.action in self.rankings:
+            return TitleListSerializer
+        if self.include_stats():
+            return TitleStatsSerializer
         return TitleReadSerializer
 
+    @action(detail=False, pagination_class=RankingPagination)
+    def top(self, request):
+        return self.list(request)
+
+    @action(detail=False, pagination_class=RankingPagination)
+    def trending(self, request):
+        return self.list(request)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        serializer = TitleBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        titles = serializer.save()
+        return Response(
+            TitleReadSerializer(titles, many=True).data,
+            status=status.HTTP_201_CREATED)
+
+
+class SearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    serializer_class = TitleSearchSerializer
+    pagination_class = PageNumberPagination
+
+    def get_queryset(self):
+        return search_titles(
+            self.request.query_params.get('q', ''),
+            Title.objects.with_genre_ids(),
+        )
+
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(get_stats([
+            CategoryViewSet.cache_namespace,
+            GenreViewSet.cache_namespace,
+            TitleViewSet.cache_namespace,
+        ]))
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportView(APIView):
+    permission_classes = [IsAdmin]
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise NotFound()
+        output = request.query_params.get('output', 'ndjson')
+        if output not in CONTENT_TYPES:
+            raise ValidationError(
+                {'output': f'Допустимые значения: {", ".join(CONTENT_TYPES)}'})
+        response = StreamingHttpResponse(
+            export(dataset, output), content_type=CONTENT_TYPES[output])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{output}"')
+        return response
+
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    pagination_class = PubDatePagination
+    max_page_size = 50
     permission_classes = [IsAuthorOrAdminOrModerator]
+    throttle_scope = 'reviews'
 
     def get_title(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(
-            Title.objects.prefetch_related('reviews'),
-            id=title_id
-        )
-        return title
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title.objects.only('id'), id=self.kwargs.get('title_id'))
+        return self._title
 
     def get_queryset(self):
-        title = self.get_title()
-        return title.reviews.all()
+        return Review.objects.filter(
+            title=self.get_title()).select_related('author')
 
     def perform_create(self, serializer):
-        author = self.request.user
-        title = self.get_title()
-        serializer.save(author=author, title=title)
+        serializer.save(
+            author_id=self.request.user.pk, title=self.get_title())
 
 
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    pagination_class = PubDatePagination
+    max_page_size = 50
     permission_classes = [IsAuthorOrAdminOrModerator]
+    throttle_scope = 'comments'
+
+    def get_review(self):
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.only('id'),
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id'),
+            )
+        return self._review
 
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(
-            Review.objects.prefetch_related('comments'),
-            id=review_id
-        )
-        return review.comments.all()
+        return Comment.objects.filter(
+            review=self.get_review()).select_related('author')
 
     def perform_create(self, serializer):
-        author = self.request.user
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(
-            Review.objects.prefetch_related('comments'),
-            id=review_id
-        )
         serializer.save(
-            author=author,
-            review=review
-        )
+            author_id=self.request.user.pk, review=self.get_review())
@@ -24,11 +24,12 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'django_filters',
 
-    'api',
-    'titles',
+    'api.apps.ApiConfig',
+    'titles.apps.TitlesConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +72,24 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'yamdb'),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+SEARCH_CONFIG = 'russian'
+SEARCH_MAX_REVIEWS = 200
+
+TITLES_BULK_MAX_SIZE = 1000
+
+RANKING_PRIOR_WEIGHT = 10
+RANKING_TRENDING_DAYS = 7
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,11 +129,25 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.CacheScopedRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'confirmation-email': '10/hour',
+        'token': '20/minute',
+        'reviews': '20/minute',
+        'comments': '30/minute',
+    },
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
@@ -123,8 +156,20 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=365),
 }
 
+TOKEN_VERSION_CACHE_TIMEOUT = int(
+    os.environ.get('TOKEN_VERSION_CACHE_TIMEOUT', 300))
+
 AUTH_USER_MODEL = 'titles.CustomUser'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 EMAIL_ADMIN = 'admin@yamdb.ru'
+
+CONFIRMATION_CODE_LIFETIME = timedelta(hours=24)
+CONFIRMATION_CODE_MAX_ATTEMPTS = 5
+
+MAIL_WORKER_BATCH_SIZE = 100
+MAIL_WORKER_INTERVAL = 5
+MAIL_MAX_ATTEMPTS = 5
+MAIL_RETRY_BACKOFF = 60
+MAIL_RETRY_MAX_DELAY = 3600
@@ -0,0 +1,30 @@
+import pytest
+
+from titles.models import Review
+
+pytest_plugins = [
+    'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_cache',
+]
+
+
+@pytest.fixture
+def add_reviews(django_user_model):
+    def add(title, start, stop, text='Отличный фильм! ' * 20):
+        authors = django_user_model.objects.bulk_create(
+            django_user_model(
+                username=f'reader{number}',
+                email=f'reader{number}@yamdb.fake',
+            )
+            for number in range(start, stop)
+        )
+        if not all(author.pk for author in authors):
+            authors = list(django_user_model.objects.filter(
+                username__startswith='reader').order_by('id')[start:stop])
+        Review.objects.bulk_create(
+            Review(title=title, author=author, text=text,
+                   score=number % 10 + 1)
+            for number, author in enumerate(authors)
+        )
+        return authors
+    return add
@@ -0,0 +1,66 @@
+import csv
+import os
+import time
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+
+PAGE_SIZES = (10, 100, 1000)
+ROUNDS = 20
+
+
+def load_reviews():
+    path = os.path.join(settings.BASE_DIR, 'data', 'review.csv')
+    with open(path, encoding='utf-8', newline='') as source:
+        return [
+            {
+                'id': int(row['id']),
+                'text': row['text'],
+                'author': f'user{row["author"]}',
+                'score': int(row['score']),
+                'pub_date': row['pub_date'],
+                'title': int(row['title_id']),
+            }
+            for row in csv.DictReader(source)
+        ]
+
+
+def get_page(reviews, size):
+    results = [
+        dict(reviews[number % len(reviews)], id=number + 1)
+        for number in range(size)
+    ]
+    return {
+        'count': size,
+        'next': None,
+        'previous': None,
+        'results': results,
+    }
+
+
+def pages_per_second(renderer, page):
+    renderer.render(page)
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        renderer.render(page)
+    return ROUNDS / (time.perf_counter() - started)
+
+
+def test_json_renderer_throughput():
+    reviews = load_reviews()
+    results = {}
+    for size in PAGE_SIZES:
+        page = get_page(reviews, size)
+        assert FastJSONRenderer().render(page) == JSONRenderer().render(page)
+        results[size] = (
+            pages_per_second(JSONRenderer(), page),
+            pages_per_second(FastJSONRenderer(), page),
+            len(JSONRenderer().render(page)),
+        )
+    print('\nreviews   KiB   JSONRenderer, pages/s   '
+          'FastJSONRenderer, pages/s')
+    for size, (default_rate, fast_rate, length) in results.items():
+        print(f'{size:>7} {length / 1024:>5.0f} {default_rate:>23.1f} '
+              f'{fast_rate:>27.1f}')
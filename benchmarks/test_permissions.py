@@ -0,0 +1,51 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.permissions import IsAuthorOrAdminOrModerator
+from titles.models import Review, Title
+
+REVIEW_COUNTS = (10, 100, 1000)
+METHODS = ('get', 'patch', 'delete')
+
+
+def get_request(method, user):
+    request = getattr(APIRequestFactory(), method)('/')
+    force_authenticate(request, user=user)
+    return Request(request)
+
+
+def check_reviews(method, user, count):
+    request = get_request(method, user)
+    permission = IsAuthorOrAdminOrModerator()
+    reviews = list(Review.objects.order_by('id')[:count])
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        allowed = sum(
+            bool(permission.has_object_permission(request, None, review))
+            for review in reviews
+        )
+        elapsed = time.perf_counter() - started
+    return allowed, len(queries), count / elapsed
+
+
+@pytest.mark.django_db
+def test_object_permission_checks_run_no_queries(add_reviews):
+    title = Title.objects.create(name='Бенчмарк', year=2000)
+    authors = add_reviews(title, 0, REVIEW_COUNTS[-1], text='Отзыв')
+    user = authors[0]
+    results = {}
+    for method in METHODS:
+        for count in REVIEW_COUNTS:
+            results[method, count] = check_reviews(method, user, count)
+    print('\nmethod   reviews   allowed   queries   checks/s')
+    for (method, count), (allowed, queries, rate) in results.items():
+        print(f'{method:<6} {count:>9} {allowed:>9} {queries:>9} '
+              f'{rate:>10.0f}')
+    for (method, count), (allowed, queries, _) in results.items():
+        assert queries == 0
+        assert allowed == (count if method == 'get' else 1)
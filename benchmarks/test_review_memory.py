@@ -0,0 +1,42 @@
+import tracemalloc
+
+import pytest
+from rest_framework.test import APIClient
+
+from titles.models import Review, Title
+
+REVIEW_COUNTS = (10, 100, 1000)
+
+
+def peak_memory(client, url):
+    client.get(url)
+    tracemalloc.start()
+    response = client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200
+    return peak
+
+
+@pytest.mark.django_db
+def test_review_requests_memory_is_flat(add_reviews):
+    title = Title.objects.create(name='Бенчмарк', year=2000)
+    client = APIClient()
+    peaks = {}
+    created = 0
+    for count in REVIEW_COUNTS:
+        add_reviews(title, created, count)
+        created = count
+        review_id = Review.objects.filter(title=title).latest('id').id
+        peaks[count] = (
+            peak_memory(client, f'/api/v1/titles/{title.id}/reviews/'),
+            peak_memory(
+                client, f'/api/v1/titles/{title.id}/reviews/{review_id}/'),
+        )
+    print('\nreviews   list peak, KiB   detail peak, KiB')
+    for count, (list_peak, detail_peak) in peaks.items():
+        print(f'{count:>7} {list_peak / 1024:>16.1f} '
+              f'{detail_peak / 1024:>17.1f}')
+    smallest, largest = peaks[REVIEW_COUNTS[0]], peaks[REVIEW_COUNTS[-1]]
+    assert largest[0] < smallest[0] * 2
+    assert largest[1] < smallest[1] * 2
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import TitleListSerializer, TitleReadSerializer
+from titles.models import Category, Genre, Title
+
+TITLE_COUNTS = (10, 100, 1000)
+ROUNDS = 5
+
+
+def add_titles(count):
+    category = Category.objects.create(name='Фильмы', slug='films')
+    genres = Genre.objects.bulk_create(
+        Genre(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(14)
+    )
+    if not all(genre.pk for genre in genres):
+        genres = list(Genre.objects.order_by('id'))
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {number}', year=2000,
+              description='Описание ' * 10, category=category)
+        for number in range(count)
+    )
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title_id=title_id, genre_id=genre.pk)
+        for number, title_id in enumerate(
+            Title.objects.values_list('id', flat=True))
+        for genre in genres[number % 3:number % 3 + 3]
+    )
+
+
+def serialize_models(count):
+    titles = Title.objects.with_genre_ids().order_by('-id')[:count]
+    return TitleReadSerializer(titles, many=True).data
+
+
+def serialize_values(count):
+    titles = Title.objects.order_by('-id').values(
+        *TitleListSerializer.get_columns())[:count]
+    return TitleListSerializer(titles, many=True).data
+
+
+def rows_per_second(serialize, count):
+    serialize(count)
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        serialize(count)
+    return count * ROUNDS / (time.perf_counter() - started)
+
+
+@pytest.mark.django_db
+def test_title_list_serializer_throughput():
+    add_titles(TITLE_COUNTS[-1])
+    renderer = JSONRenderer()
+    results = {}
+    for count in TITLE_COUNTS:
+        assert renderer.render(serialize_values(count)) == renderer.render(
+            serialize_models(count))
+        results[count] = (
+            rows_per_second(serialize_models, count),
+            rows_per_second(serialize_values, count),
+        )
+    print('\ntitles   ModelSerializer, rows/s   values(), rows/s')
+    for count, (models_rate, values_rate) in results.items():
+        print(f'{count:>6} {models_rate:>25.0f} {values_rate:>18.0f}')
+    assert results[TITLE_COUNTS[-1]][1] > results[TITLE_COUNTS[-1]][0]
@@ -1,5 +1,16 @@
+import datetime
+from io import StringIO
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from titles.models import ConfirmationCode, EmailOutbox
+from titles.outbox import deliver_outbox
 
 from .common import auth_client, create_users_api
 
@@ -352,3 +363,197 @@ class Test01UserAPI:
         assert test_moderator.first_name == 'NewTest', (
             'Проверьте, что при PATCH запросе `/api/v1/users/me/` изменяете данные'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_users_stateless_token(self, client, user_client, mailoutbox):
+        user, moderator = create_users_api(user_client)
+
+        def get_token():
+            response = client.post('/api/v1/auth/email/', data={'email': user.email})
+            assert response.status_code == 201
+            call_command('run_mail_worker', once=True, stdout=StringIO())
+            code = mailoutbox[-1].body.rsplit(' ', 1)[-1]
+            response = client.post(
+                '/api/v1/auth/token/', data={'email': user.email, 'confirmation_code': code})
+            assert response.status_code == 200
+            token_client = APIClient()
+            token_client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+            return token_client
+
+        token_client = get_token()
+        token_client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as queries:
+            response = token_client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        user_table = get_user_model()._meta.db_table
+        assert not any(user_table in query['sql'] for query in queries), (
+            'Проверьте, что запрос с токеном из `/api/v1/auth/token/` не загружает пользователя из базы'
+        )
+        assert token_client.get('/api/v1/users/').status_code == 403
+        response = token_client.get('/api/v1/users/me/')
+        assert response.status_code == 200 and response.json().get('email') == user.email, (
+            'Проверьте, что `/api/v1/users/me/` возвращает данные пользователя из базы'
+        )
+        user_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'admin'})
+        response = token_client.get('/api/v1/users/')
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли старый токен перестаёт действовать'
+        )
+        assert get_token().get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что новый токен учитывает изменённую роль'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_13_confirmation_email_outbox(self, client, mailoutbox, settings):
+        response = client.post('/api/v1/auth/email/', data={'email': 'reader@yamdb.fake'})
+        assert response.status_code == 201
+        assert len(mailoutbox) == 0, (
+            'Проверьте, что `/api/v1/auth/email/` не отправляет письмо во время запроса'
+        )
+        letter = EmailOutbox.objects.get(recipient='reader@yamdb.fake')
+        user = get_user_model().objects.get(email='reader@yamdb.fake')
+        assert not user.is_active and not user.has_usable_password(), (
+            'Проверьте, что до подтверждения учётная запись неактивна и код не хранится в поле `password`'
+        )
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+        settings.EMAIL_HOST, settings.EMAIL_PORT, settings.EMAIL_TIMEOUT = '127.0.0.1', 1, 1
+        call_command('run_mail_worker', once=True, stdout=StringIO())
+        letter.refresh_from_db()
+        assert letter.sent_at is None and letter.attempts == 1 and letter.last_error, (
+            'Проверьте, что `run_mail_worker` откладывает письмо, если почтовый сервер недоступен'
+        )
+        assert letter.next_attempt_at > timezone.now()
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        call_command('run_mail_worker', once=True, stdout=StringIO())
+        assert len(mailoutbox) == 0
+        assert deliver_outbox(now=letter.next_attempt_at) == (1, 0)
+        assert len(mailoutbox) == 1 and mailoutbox[0].to == ['reader@yamdb.fake'], (
+            'Проверьте, что `run_mail_worker` отправляет письма из очереди'
+        )
+        assert deliver_outbox(now=letter.next_attempt_at) == (0, 0)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_14_confirmation_codes(self, client, mailoutbox, settings):
+        email = 'reader@yamdb.fake'
+        client.post('/api/v1/auth/email/', data={'email': email})
+        call_command('run_mail_worker', once=True, stdout=StringIO())
+        code = mailoutbox[-1].body.rsplit(' ', 1)[-1]
+        assert ConfirmationCode.objects.get(email=email).code_hash != code
+        response = client.post('/api/v1/auth/token/', data={'email': email, 'confirmation_code': 'wrong'})
+        assert response.status_code == 400
+        assert ConfirmationCode.objects.get(email=email).attempts == 1
+        response = client.post('/api/v1/auth/token/', data={'email': email, 'confirmation_code': code})
+        assert response.status_code == 200 and 'token' in response.json(), (
+            'Проверьте, что `/api/v1/auth/token/` выдаёт токен по коду из письма'
+        )
+        assert get_user_model().objects.get(email=email).is_active
+        response = client.post('/api/v1/auth/token/', data={'email': email, 'confirmation_code': code})
+        assert response.status_code == 400, (
+            'Проверьте, что код подтверждения нельзя использовать повторно'
+        )
+        response = client.post('/api/v1/auth/email/', data={'email': email})
+        assert response.status_code == 201, (
+            'Проверьте, что подтверждённый пользователь может запросить новый код на `/api/v1/auth/email/`'
+        )
+        call_command('run_mail_worker', once=True, stdout=StringIO())
+        code = mailoutbox[-1].body.rsplit(' ', 1)[-1]
+        response = client.post('/api/v1/auth/token/', data={'email': email, 'confirmation_code': code})
+        assert response.status_code == 200, (
+            'Проверьте, что новый код подтверждённого пользователя принимается `/api/v1/auth/token/`'
+        )
+        assert get_user_model().objects.filter(email=email).count() == 1
+
+        banned = get_user_model().objects.get(email=email)
+        banned.is_active = False
+        banned.save()
+        response = client.post('/api/v1/auth/email/', data={'email': email})
+        assert response.status_code == 400, (
+            'Проверьте, что заблокированный пользователь не может запросить код подтверждения'
+        )
+        code = ConfirmationCode.objects.issue(email)
+        response = client.post('/api/v1/auth/token/', data={'email': email, 'confirmation_code': code})
+        assert response.status_code == 400 and not get_user_model().objects.get(email=email).is_active, (
+            'Проверьте, что заблокированный пользователь не может снова активировать учётную запись'
+        )
+        ConfirmationCode.objects.filter(email=email).delete()
+        get_user_model().objects.filter(email=email).update(
+            last_login=None, date_joined=timezone.now() - datetime.timedelta(days=2))
+
+        client.post('/api/v1/auth/email/', data={'email': 'late@yamdb.fake'})
+        client.post('/api/v1/auth/email/', data={'email': 'late@yamdb.fake'})
+        assert get_user_model().objects.filter(email='late@yamdb.fake').count() == 1, (
+            'Проверьте, что повторный запрос кода не создаёт второго пользователя'
+        )
+        code = ConfirmationCode.objects.issue('late@yamdb.fake', now=timezone.now() - datetime.timedelta(days=2))
+        response = client.post('/api/v1/auth/token/', data={'email': 'late@yamdb.fake', 'confirmation_code': code})
+        assert response.status_code == 400, 'Проверьте, что просроченный код не принимается'
+        code = ConfirmationCode.objects.issue('blocked@yamdb.fake')
+        for _ in range(settings.CONFIRMATION_CODE_MAX_ATTEMPTS):
+            ConfirmationCode.objects.verify('blocked@yamdb.fake', 'wrong')
+        assert not ConfirmationCode.objects.verify('blocked@yamdb.fake', code), (
+            'Проверьте, что после исчерпания попыток код перестаёт действовать'
+        )
+
+        get_user_model().objects.filter(email='late@yamdb.fake').update(
+            date_joined=timezone.now() - datetime.timedelta(days=2))
+        out = StringIO()
+        call_command('purge_confirmation_codes', batch_size=1, stdout=out)
+        assert 'кодов подтверждения: 2, неподтверждённых пользователей: 1' in out.getvalue()
+        assert not ConfirmationCode.objects.exists()
+        assert not get_user_model().objects.filter(email='late@yamdb.fake').exists()
+        assert get_user_model().objects.filter(email=email).exists(), (
+            'Проверьте, что `purge_confirmation_codes` не удаляет заблокированных пользователей'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_15_auth_throttled(self, client, settings):
+        settings.REST_FRAMEWORK = dict(
+            settings.REST_FRAMEWORK,
+            DEFAULT_THROTTLE_RATES=dict(
+                settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **{'confirmation-email': '2/day', 'token': '3/day'}),
+        )
+        for number in range(2):
+            response = client.post('/api/v1/auth/email/', data={'email': f'bot{number}@yamdb.fake'})
+            assert response.status_code == 201
+        response = client.post('/api/v1/auth/email/', data={'email': 'bot2@yamdb.fake'})
+        assert response.status_code == 429, (
+            'Проверьте, что частые запросы к `/api/v1/auth/email/` с одного адреса ограничиваются статусом 429'
+        )
+        assert not get_user_model().objects.filter(email='bot2@yamdb.fake').exists()
+        data = {'email': 'bot0@yamdb.fake', 'confirmation_code': 'wrong'}
+        for _ in range(3):
+            assert client.post('/api/v1/auth/token/', data=data).status_code == 400
+        assert client.post('/api/v1/auth/token/', data=data).status_code == 429, (
+            'Проверьте, что перебор кодов на `/api/v1/auth/token/` ограничивается статусом 429'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_16_auth_throttle_ignores_spoofed_forwarded_for(self, client, settings):
+        settings.REST_FRAMEWORK = dict(
+            settings.REST_FRAMEWORK,
+            DEFAULT_THROTTLE_RATES=dict(
+                settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **{'confirmation-email': '2/day'}),
+        )
+        for number in range(3):
+            response = client.post(
+                '/api/v1/auth/email/', data={'email': f'direct{number}@yamdb.fake'},
+                HTTP_X_FORWARDED_FOR=f'198.51.100.{number}', REMOTE_ADDR='192.0.2.1')
+            assert response.status_code == (201 if number < 2 else 429), (
+                'Проверьте, что без прокси (`NUM_PROXIES` = 0) лимит `/api/v1/auth/email/` '
+                'не зависит от заголовка X-Forwarded-For'
+            )
+        settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)
+        for number in range(3):
+            response = client.post(
+                '/api/v1/auth/email/', data={'email': f'spoof{number}@yamdb.fake'},
+                HTTP_X_FORWARDED_FOR=f'198.51.100.{number}, 203.0.113.7')
+            assert response.status_code == (201 if number < 2 else 429), (
+                'Проверьте, что лимит `/api/v1/auth/email/` считается по адресу, который добавил nginx, '
+                'а не по подставленному клиентом X-Forwarded-For'
+            )
+        response = client.post(
+            '/api/v1/auth/email/', data={'email': 'spoof2@yamdb.fake'},
+            HTTP_X_FORWARDED_FOR='203.0.113.7, 203.0.113.8')
+        assert response.status_code == 201, (
+            'Проверьте, что у разных клиентов за nginx отдельные лимиты'
+        )
@@ -1,7 +1,19 @@
+import datetime
+import json
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import TitleReadSerializer
+from titles.models import Review, Title
 
 from .common import (auth_client, create_categories, create_genre,
-                     create_titles, create_users_api)
+                     create_reviews, create_titles, create_users_api)
 
 
 class Test04TitleAPI:
@@ -239,3 +251,209 @@ class Test04TitleAPI:
         user, moderator = create_users_api(user_client)
         self.check_permissions(user, 'обычного пользователя', titles, categories, genres)
         self.check_permissions(moderator, 'модератора', titles, categories, genres)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_titles_constant_queries(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/')
+        list_queries = len(context)
+        with CaptureQueriesContext(connection) as context:
+            client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        detail_queries = len(context)
+        for number in range(8):
+            data = {'name': f'Произведение {number}', 'year': 2000,
+                    'genre': [genre['slug'] for genre in genres],
+                    'category': categories[number % 2]['slug']}
+            user_client.post('/api/v1/titles/', data=data)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == 10
+        assert len(context) == list_queries, (
+            'Проверьте, что количество запросов к базе при GET запросе `/api/v1/titles/` '
+            'не зависит от количества произведений на странице'
+        )
+        with CaptureQueriesContext(connection) as context:
+            client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert len(context) == detail_queries, (
+            'Проверьте, что количество запросов к базе при GET запросе `/api/v1/titles/{title_id}/` '
+            'не зависит от количества жанров произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_titles_filters(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        data = {'name': 'Поворот', 'year': 2020, 'genre': [genres[1]['slug']],
+                'category': categories[1]['slug'], 'description': 'Крутое пике'}
+        user_client.post('/api/v1/titles/', data=data)
+        data = {'name': 'Project X', 'year': 1999, 'genre': [genres[2]['slug']],
+                'category': categories[1]['slug']}
+        user_client.post('/api/v1/titles/', data=data)
+
+        response = client.get(f'/api/v1/titles/?genre={genres[0]["slug"]},{genres[1]["slug"]}')
+        data = response.json()
+        assert data['count'] == 2 and len({title['id'] for title in data['results']}) == 2, (
+            'Проверьте, что при фильтрации `/api/v1/titles/` по нескольким жанрам '
+            'произведения не дублируются'
+        )
+        response = client.get(f'/api/v1/titles/?genre={genres[0]["slug"][:3]}')
+        assert response.json()['count'] == 0, (
+            'Проверьте, что `/api/v1/titles/` фильтруется по точному `slug` жанра'
+        )
+        response = client.get(f'/api/v1/titles/?category={categories[0]["slug"][:3]}')
+        assert response.json()['count'] == 0, (
+            'Проверьте, что `/api/v1/titles/` фильтруется по точному `slug` категории'
+        )
+        response = client.get('/api/v1/titles/?name=project')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что фильтр `/api/v1/titles/` по `name` не зависит от регистра'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_titles_bulk_create(self, client, user_client):
+        categories = create_categories(user_client)
+        genres = create_genre(user_client)
+        data = [
+            {'name': f'Произведение {number}', 'year': 2000 + number,
+             'genre': [genre['slug'] for genre in genres],
+             'category': categories[number % 2]['slug']}
+            for number in range(20)
+        ]
+        response = client.post('/api/v1/titles/bulk/', data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 401, (
+            'Проверьте, что `/api/v1/titles/bulk/` недоступен без авторизации'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post('/api/v1/titles/bulk/', data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 201, (
+            'Проверьте, что при POST запросе `/api/v1/titles/bulk/` с правильными данными возвращается статус 201'
+        )
+        assert [title['name'] for title in response.json()] == [item['name'] for item in data]
+        assert response.json()[3]['category'] == categories[1]
+        assert len(response.json()[3]['genre']) == len(genres)
+        inserts = [query for query in context.captured_queries if query['sql'].startswith('INSERT INTO "titles_title')]
+        assert len(inserts) == 2, (
+            'Проверьте, что `/api/v1/titles/bulk/` создаёт произведения и их жанры пачкой, '
+            'а не отдельными запросами к базе'
+        )
+        response = client.get('/api/v1/titles/', {'genre': genres[0]['slug']})
+        assert response.json()['count'] == 20
+
+        data = [
+            {'name': 'Новое произведение', 'year': 2000,
+             'genre': [genres[0]['slug']], 'category': categories[0]['slug']},
+            {'name': 'Произведение 0', 'year': 2000,
+             'genre': [genres[0]['slug']], 'category': categories[0]['slug']},
+            {'name': 'Ещё произведение', 'year': 3000,
+             'genre': ['unknown'], 'category': 'unknown'},
+        ]
+        response = user_client.post('/api/v1/titles/bulk/', data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 400, (
+            'Проверьте, что при POST запросе `/api/v1/titles/bulk/` с неправильными данными возвращается статус 400'
+        )
+        errors = response.json()
+        assert errors[0] == {} and set(errors[1]) == {'name'}, (
+            'Проверьте, что `/api/v1/titles/bulk/` возвращает ошибки для каждого произведения отдельно'
+        )
+        assert set(errors[2]) == {'year'}
+        data[2]['year'] = 2000
+        errors = user_client.post('/api/v1/titles/bulk/', data=json.dumps(data), content_type='application/json').json()
+        assert set(errors[2]) == {'genre', 'category'}
+        assert response.json() and client.get('/api/v1/titles/').json()['count'] == 20, (
+            'Проверьте, что `/api/v1/titles/bulk/` не создаёт ни одного произведения, если в запросе есть ошибки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_titles_write_slugs(self, user_client):
+        categories = create_categories(user_client)
+        genres = create_genre(user_client)
+        data = {'name': 'Поворот туда', 'year': 2000, 'genre': [genre['slug'] for genre in genres],
+                'category': categories[0]['slug']}
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post('/api/v1/titles/', data=data)
+        assert response.status_code == 201
+        genre_queries = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and '"titles_genre"."slug" FROM' in query['sql']
+        ]
+        assert len(genre_queries) == 1, (
+            'Проверьте, что при POST запросе `/api/v1/titles/` все slug жанров проверяются одним запросом, '
+            'а жанры в ответе не запрашиваются повторно'
+        )
+        title = response.json()
+        assert title == user_client.get(f'/api/v1/titles/{title["id"]}/').json(), (
+            'Проверьте, что при POST запросе `/api/v1/titles/` возвращается то же представление, что и при GET запросе'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.patch(f'/api/v1/titles/{title["id"]}/', data={'genre': [genres[0]['slug']]})
+        assert response.status_code == 200
+        genre_queries = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and '"titles_genre"."slug" FROM' in query['sql']
+        ]
+        assert not genre_queries, (
+            'Проверьте, что при PATCH запросе `/api/v1/titles/{title_id}/` жанры в ответе не запрашиваются повторно'
+        )
+        assert response.json()['genre'] == [genres[0]] and response.json()['category'] == categories[0]
+        response = user_client.patch(
+            f'/api/v1/titles/{title["id"]}/', data={'genre': [genres[0]['slug'], 'unknown', 'missing']}
+        )
+        assert response.status_code == 400
+        assert 'unknown' in response.json()['genre'][0] and 'missing' in response.json()['genre'][0], (
+            'Проверьте, что при неправильных slug жанров в ответе перечислены все несуществующие slug'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_09_titles_list_matches_read_serializer(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        Title.objects.filter(pk=titles[0]['id']).update(rating_sum=7, rating_count=2, rating=3.5)
+        Title.objects.create(name='Без жанров и категории', year=1999, description='Описание')
+        response = client.get('/api/v1/titles/')
+        expected = TitleReadSerializer(Title.objects.with_genre_ids().order_by('-id')[:10], many=True).data
+        assert JSONRenderer().render(response.json()['results']) == JSONRenderer().render(expected), (
+            'Проверьте, что список `/api/v1/titles/` совпадает с выводом `TitleReadSerializer`'
+        )
+        response = client.get('/api/v1/titles/', {'cursor': ''}, HTTP_ACCEPT='text/html')
+        assert response.status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_10_titles_top_and_trending(self, client, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        user_client.post(f'/api/v1/titles/{titles[1]["id"]}/reviews/', data={'text': 'Отлично', 'score': 10})
+        new_title = Title.objects.create(name='Без отзывов', year=2000, description='Описание')
+        Review.objects.filter(title_id=titles[0]['id']).update(
+            pub_date=timezone.now() - datetime.timedelta(days=30))
+        response = client.get('/api/v1/titles/top/')
+        assert response.status_code == 200, 'Проверьте, что `/api/v1/titles/top/` доступен без авторизации'
+        assert response.json()['results'] == [], (
+            'Проверьте, что `/api/v1/titles/top/` выводит только произведения с рассчитанным рейтингом'
+        )
+        out = StringIO()
+        call_command('refresh_rankings', stdout=out)
+        assert 'рейтинге: 3' in out.getvalue()
+        response = client.get('/api/v1/titles/top/')
+        data = response.json()
+        assert 'count' not in data, 'Проверьте, что `/api/v1/titles/top/` по умолчанию не считает `count`'
+        assert [title['id'] for title in data['results']] == [titles[1]['id'], new_title.pk, titles[0]['id']], (
+            'Проверьте, что `/api/v1/titles/top/` сортирует произведения по байесовскому рейтингу'
+        )
+        assert data['results'][0]['rating'] == 10
+        response = client.get('/api/v1/titles/trending/')
+        assert [title['id'] for title in response.json()['results']] == [titles[1]['id']], (
+            'Проверьте, что `/api/v1/titles/trending/` учитывает только свежие отзывы'
+        )
+        response = client.get('/api/v1/titles/top/', {'count': 'true', 'page_size': 1})
+        data = response.json()
+        assert data['count'] == 3 and len(data['results']) == 1
+        out = StringIO()
+        call_command('refresh_rankings', stdout=out)
+        assert 'рейтинге: 0' in out.getvalue(), (
+            'Проверьте, что `refresh_rankings` не пересчитывает неизменившиеся рейтинги'
+        )
+        Review.objects.filter(title_id=titles[1]['id']).update(
+            pub_date=timezone.now() - datetime.timedelta(days=30))
+        call_command('refresh_rankings', stdout=StringIO())
+        response = client.get('/api/v1/titles/trending/')
+        assert response.json()['results'] == [], (
+            'Проверьте, что `/api/v1/titles/trending/` обновляется после `refresh_rankings`'
+        )
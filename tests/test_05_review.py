@@ -1,4 +1,20 @@
+import datetime
+import decimal
+from io import StringIO
+
 import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.permissions import IsAuthorOrAdminOrModerator
+from api.renderers import FastJSONRenderer
+
+from titles.models import Review, ScoreBucket, Title
 
 from .common import (auth_client, create_reviews, create_titles,
                      create_users_api)
@@ -289,3 +305,262 @@ class Test05ReviewAPI:
             'без токена авторизации возвращается статус 401'
         )
         self.check_permissions(user, 'обычного пользователя', reviews, titles)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_review_rating_maintained(self, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        user_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        response = user_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('rating') == 3.5, (
+            'Проверьте, что после DELETE запроса `/api/v1/titles/{title_id}/reviews/{review_id}/` '
+            'пересчитывается значение `rating`'
+        )
+        user_client.delete(f'/api/v1/users/{user.username}/')
+        response = user_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('rating') == 4, (
+            'Проверьте, что при удалении пользователя пересчитывается `rating` произведений с его отзывами'
+        )
+        user_client.delete(f'/api/v1/users/{moderator.username}/')
+        response = user_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('rating') is None, (
+            'Проверьте, что `rating` произведения без отзывов равен `None`'
+        )
+
+        self.create_review(user_client, titles[1]["id"], 'qwerty', 6)
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        etag = user_client.get(f'/api/v1/titles/{titles[1]["id"]}/')['ETag']
+        call_command('recalculate_ratings', stdout=StringIO())
+        response = user_client.get(f'/api/v1/titles/{titles[1]["id"]}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json().get('rating') == 6, (
+            'Проверьте, что команда `recalculate_ratings` восстанавливает значение `rating` и сбрасывает кэш'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_reviews_cursor_pagination(self, client, user_client, django_user_model):
+        titles, _, _ = create_titles(user_client)
+        for number in range(12):
+            author = django_user_model.objects.create(
+                username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+            Review.objects.create(
+                title_id=titles[0]['id'], author=author, text=f'text{number}', score=5)
+        expected = list(
+            Review.objects.filter(title_id=titles[0]['id'])
+            .order_by('-pub_date', '-id').values_list('id', flat=True)
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor='
+        received = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/?cursor=` '
+                'возвращается статус 200'
+            )
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/?cursor=` '
+                'не возвращается параметр `count`'
+            )
+            received.extend(review['id'] for review in data['results'])
+            url = data['next']
+        assert received == expected, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/?cursor=` '
+            'отзывы возвращаются по убыванию `pub_date` без пропусков и повторов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_reviews_query_count_header(self, client, user_client, admin, settings):
+        settings.DEBUG = True
+        titles, _, _ = create_titles(user_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        self.create_review(user_client, titles[0]["id"], 'qwerty', 5)
+        response = client.get(url)
+        assert 'X-Query-Count' in response, (
+            'Проверьте, что в режиме DEBUG ответ содержит заголовок `X-Query-Count`'
+        )
+        single_review_queries = int(response['X-Query-Count'])
+        user, moderator = create_users_api(user_client)
+        self.create_review(auth_client(user), titles[0]["id"], 'qwerty123', 3)
+        self.create_review(auth_client(moderator), titles[0]["id"], 'qwerty321', 4)
+        response = client.get(url)
+        assert len(response.json()['results']) == 3
+        assert int(response['X-Query-Count']) == single_review_queries, (
+            'Проверьте, что количество запросов к базе при GET запросе `/api/v1/titles/{title_id}/reviews/` '
+            'не зависит от количества отзывов'
+        )
+        settings.DEBUG = False
+        response = client.get(url)
+        assert 'X-Query-Count' not in response, (
+            'Проверьте, что без режима DEBUG заголовок `X-Query-Count` не добавляется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_reviews_json_rendering(self, client, user_client, admin):
+        titles, _, _ = create_titles(user_client)
+        text = 'Отличный фильм, \u2028смотрели всей семьёй! «Кавычки» и эмодзи 🎬 ' * 50
+        user_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': text, 'score': 7})
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/')
+        assert isinstance(response.accepted_renderer, FastJSONRenderer)
+        assert response.content == JSONRenderer().render(response.data), (
+            'Проверьте, что ответ API совпадает с выводом стандартного `JSONRenderer`'
+        )
+        assert b'\\u2028' in response.content and '«Кавычки»'.encode() in response.content
+        data = {
+            'pub_date': timezone.now(),
+            'naive': datetime.datetime(2019, 9, 24, 21, 8, 21, 567000),
+            'day': datetime.date(2019, 9, 24),
+            'score': decimal.Decimal('7.50'),
+            1: [None, True, 1.5],
+        }
+        for media_type in (None, 'application/json; indent=4'):
+            assert FastJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type), (
+                'Проверьте, что `FastJSONRenderer` выводит даты и `Decimal` так же, как `JSONRenderer`'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_09_reviews_page_size_and_no_count(self, client, user_client, django_user_model):
+        titles, _, _ = create_titles(user_client)
+        for number in range(60):
+            author = django_user_model.objects.create(
+                username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+            Review.objects.create(
+                title_id=titles[0]['id'], author=author, text=f'text{number}', score=5)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url, {'page_size': 25})
+        assert len(response.json()['results']) == 25 and response.json()['count'] == 60, (
+            'Проверьте, что размер страницы задаётся параметром `page_size`'
+        )
+        response = client.get(url, {'page_size': 1000})
+        assert len(response.json()['results']) == 50, (
+            'Проверьте, что размер страницы `/api/v1/titles/{title_id}/reviews/` ограничен сверху'
+        )
+        response = client.get(url, {'page_size': 1000, 'cursor': ''})
+        assert len(response.json()['results']) == 50
+
+        expected = list(
+            Review.objects.filter(title_id=titles[0]['id'])
+            .order_by('-pub_date', '-id').values_list('id', flat=True)
+        )
+        received = []
+        next_url = f'{url}?count=false&page_size=25'
+        while next_url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(next_url)
+            assert response.status_code == 200
+            assert not any('COUNT(' in query['sql'] for query in context.captured_queries), (
+                'Проверьте, что при `count=false` не выполняется подсчёт количества объектов'
+            )
+            data = response.json()
+            assert 'count' not in data and set(data) == {'next', 'previous', 'results'}
+            received.extend(review['id'] for review in data['results'])
+            next_url = data['next']
+        assert received == expected, (
+            'Проверьте, что при `count=false` ссылка `next` позволяет получить все отзывы без пропусков'
+        )
+        assert 'page=2' in data['previous'] and len(data['results']) == 10
+        response = client.get(url, {'count': 'false', 'page': 4, 'page_size': 25})
+        assert response.status_code == 404
+
+        response = user_client.get('/api/v1/users/', {'page_size': 1000, 'count': 'false'})
+        assert response.status_code == 200 and 'count' not in response.json(), (
+            'Проверьте, что `/api/v1/users/` поддерживает `page_size` и `count=false`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_10_review_stats(self, client, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        assert 'score_histogram' not in response.json(), (
+            'Проверьте, что статистика отзывов выводится только с параметром `include=stats`'
+        )
+        histogram = {str(score): 0 for score in range(1, 11)}
+        histogram.update({'3': 1, '4': 1, '5': 1})
+        response = client.get(url, {'include': 'stats'})
+        assert response.json()['reviews_count'] == 3 and response.json()['score_histogram'] == histogram, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/?include=stats` возвращаются '
+            '`reviews_count` и `score_histogram`'
+        )
+        user_client.patch(f'{url}reviews/{reviews[0]["id"]}/', data={'score': 9})
+        user_client.delete(f'{url}reviews/{reviews[1]["id"]}/')
+        histogram.update({'3': 0, '5': 0, '9': 1})
+        response = client.get(url, {'include': 'stats'})
+        assert response.json()['reviews_count'] == 2 and response.json()['score_histogram'] == histogram, (
+            'Проверьте, что статистика отзывов обновляется при изменении и удалении отзывов'
+        )
+        call_command('rebuild_review_stats', check=True)
+
+        ScoreBucket.objects.update(count=0)
+        etag = client.get(url, {'include': 'stats'})['ETag']
+        with pytest.raises(CommandError):
+            call_command('rebuild_review_stats', check=True)
+        assert client.get(url, {'include': 'stats'}, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        call_command('rebuild_review_stats', stdout=StringIO())
+        call_command('rebuild_review_stats', check=True, stdout=StringIO())
+        response = client.get(url, {'include': 'stats'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json()['score_histogram'] == histogram, (
+            'Проверьте, что команда `rebuild_review_stats` восстанавливает гистограммы оценок и сбрасывает кэш'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_11_review_permission_uses_author_id(self, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        client_user = auth_client(user)
+        response = client_user.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[2]["id"]}/')
+        assert response.status_code == 200, (
+            'Проверьте, что пользователь может читать чужой отзыв `/api/v1/titles/{{title_id}}/reviews/{{review_id}}/`'
+        )
+        response = client_user.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[2]["id"]}/', data={'text': 'Чужой'})
+        assert response.status_code == 403, (
+            'Проверьте, что пользователь не может изменить чужой отзыв'
+        )
+        request = Request(APIRequestFactory().patch('/'))
+        request.user = user
+        permission = IsAuthorOrAdminOrModerator()
+        own, other = Review.objects.get(pk=reviews[1]['id']), Review.objects.get(pk=reviews[2]['id'])
+        with CaptureQueriesContext(connection) as queries:
+            assert permission.has_object_permission(request, None, own)
+            assert not permission.has_object_permission(request, None, other)
+        assert len(queries) == 0, (
+            'Проверьте, что проверка прав на отзыв сравнивает `author_id` и не загружает автора'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_title_save_keeps_rating(self, user_client, admin):
+        titles, _, _ = create_titles(user_client)
+        loaded = Title.objects.get(pk=titles[0]['id'])
+        self.create_review(user_client, titles[0]['id'], 'Отзыв', 10)
+        loaded.description = 'Новое описание'
+        loaded.save()
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count, title.rating) == (10, 1, 10), (
+            'Проверьте, что сохранение произведения, загруженного до появления отзыва, не затирает `rating`'
+        )
+        assert title.description == 'Новое описание'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_13_title_delete_skips_rating_updates(self, user_client, django_user_model):
+        titles, _, _ = create_titles(user_client)
+        for number in range(30):
+            author = django_user_model.objects.create(
+                username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+            for title in titles[:1] if number >= 3 else titles:
+                Review.objects.create(
+                    title_id=title['id'], author=author, text=f'text{number}', score=5)
+        with pytest.raises(ZeroDivisionError):
+            with transaction.atomic():
+                Title.objects.filter(pk=titles[0]['id']).delete()
+                1 / 0
+        Review.objects.filter(title_id=titles[0]['id']).first().delete()
+        assert Title.objects.get(pk=titles[0]['id']).rating_count == 29, (
+            'Проверьте, что после отката удаления произведения `rating` снова обновляется при удалении отзыва'
+        )
+        queries = []
+        for title in titles:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    Title.objects.filter(pk=title['id']).delete()
+            queries.append(len(captured))
+        assert queries[0] == queries[1], (
+            'Проверьте, что удаление произведения не обновляет `rating` для каждого удаляемого отзыва'
+        )
@@ -1,4 +1,6 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from .common import auth_client, create_comments, create_reviews
 
@@ -246,3 +248,50 @@ class Test06CommentAPI:
             'без токена авторизации возвращается статус 401'
         )
         self.check_permissions(user, 'обычного пользователя', f'{pre_url}{comments[2]["id"]}/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_comments_constant_queries(self, client, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        self.create_comment(user_client, titles[0]["id"], reviews[0]["id"], 'qwerty')
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        single_comment_queries = len(context)
+        self.create_comment(auth_client(user), titles[0]["id"], reviews[0]["id"], 'qwerty123')
+        self.create_comment(auth_client(moderator), titles[0]["id"], reviews[0]["id"], 'qwerty321')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert len(response.json()['results']) == 3
+        assert len(context) == single_comment_queries, (
+            'Проверьте, что количество запросов к базе при GET запросе '
+            '`/api/v1/titles/{title_id}/reviews/{review_id}/comments/` не зависит от количества комментариев'
+        )
+        response = client.get(f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/comments/')
+        assert response.status_code == 404, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+            'для отзыва к другому произведению возвращается статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_comments_throttled(self, client, user_client, admin, settings):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        settings.REST_FRAMEWORK = dict(
+            settings.REST_FRAMEWORK,
+            DEFAULT_THROTTLE_RATES=dict(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], comments='3/day'),
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        client_user = auth_client(user)
+        for _ in range(3):
+            assert client_user.post(url, data={'text': 'Спам'}).status_code == 201
+        response = client_user.post(url, data={'text': 'Спам'})
+        assert response.status_code == 429, (
+            'Проверьте, что частые POST запросы к `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+            'ограничиваются статусом 429'
+        )
+        assert 0 < int(response['Retry-After']) <= 24 * 60 * 60
+        assert client_user.get(url).status_code == 200, (
+            'Проверьте, что ограничение не распространяется на чтение комментариев'
+        )
+        assert auth_client(moderator).post(url, data={'text': 'Отзыв'}).status_code == 201, (
+            'Проверьте, что ограничение считается отдельно для каждого пользователя'
+        )
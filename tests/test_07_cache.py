@@ -0,0 +1,186 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from titles.models import Category
+
+from .common import (auth_client, create_categories, create_genre, create_reviews,
+                     create_titles, create_users_api)
+
+
+class Test07CacheAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_catalog_cache_invalidation(self, client, user_client):
+        create_categories(user_client)
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 2
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 2
+        response = user_client.get('/api/v1/cache/stats/')
+        assert response.json()['categories'] == {'hits': 1, 'misses': 1}, (
+            'Проверьте, что повторный GET запрос `/api/v1/categories/` без токена '
+            'обслуживается из кэша'
+        )
+        user_client.post('/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'})
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 3, (
+            'Проверьте, что после POST запроса `/api/v1/categories/` кэш списка категорий сбрасывается'
+        )
+        user_client.delete('/api/v1/categories/music/')
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что после DELETE запроса `/api/v1/categories/{slug}/` кэш списка категорий сбрасывается'
+        )
+        response = client.get('/api/v1/categories/?search=Книги')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что кэш учитывает параметры запроса'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_cache_invalidation(self, client, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url).json()['rating'] == 4
+        user_client.patch(f'{url}reviews/{reviews[0]["id"]}/', data={'score': 8})
+        assert client.get(url).json()['rating'] == 5, (
+            'Проверьте, что после изменения отзыва кэш произведения сбрасывается'
+        )
+        user_client.patch(url, data={'genre': ['drama']})
+        genres = client.get(url).json()['genre']
+        assert [genre['slug'] for genre in genres] == ['drama'], (
+            'Проверьте, что после изменения жанров произведения кэш сбрасывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cache_stats_permissions(self, client, user_client):
+        response = client.get('/api/v1/cache/stats/')
+        assert response.status_code == 401, (
+            'Проверьте, что GET запрос `/api/v1/cache/stats/` без токена возвращает статус 401'
+        )
+        user, _ = create_users_api(user_client)
+        response = auth_client(user).get('/api/v1/cache/stats/')
+        assert response.status_code == 403, (
+            'Проверьте, что GET запрос `/api/v1/cache/stats/` доступен только администратору'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_conditional_get(self, client, user_client):
+        create_categories(user_client)
+        response = client.get('/api/v1/categories/')
+        etag = response.get('ETag')
+        assert etag and response.get('Last-Modified'), (
+            'Проверьте, что GET запрос `/api/v1/categories/` возвращает заголовки `ETag` и `Last-Modified`'
+        )
+        response = user_client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что GET запрос `/api/v1/categories/` с актуальным `If-None-Match` '
+            'возвращает статус 304'
+        )
+        assert response.get('ETag') == etag
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304 and len(context) == 0, (
+            'Проверьте, что ответ 304 на GET запрос `/api/v1/categories/` не обращается к базе'
+        )
+        response = client.get('/api/v1/categories/?search=Книги', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что `ETag` зависит от параметров запроса'
+        )
+        user_client.post('/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'})
+        response = client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения категорий прежний `ETag` больше не возвращает статус 304'
+        )
+        assert response.json()['count'] == 3
+        response = client.get(
+            '/api/v1/categories/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304, (
+            'Проверьте, что GET запрос `/api/v1/categories/` с актуальным `If-Modified-Since` '
+            'возвращает статус 304'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_category_genre_catalog(self, user_client):
+        categories = create_categories(user_client)
+        genres = create_genre(user_client)
+        data = {'name': 'Поворот туда', 'year': 2000, 'genre': [genre['slug'] for genre in genres],
+                'category': categories[0]['slug']}
+        user_client.post('/api/v1/titles/', data=data)
+        user_client.get('/api/v1/titles/')
+        data = {'name': 'Проект', 'year': 2000, 'genre': [genres[0]['slug']], 'category': categories[1]['slug']}
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post('/api/v1/titles/', data=data)
+            user_client.get('/api/v1/titles/', {'genre': genres[0]['slug'], 'category': categories[1]['slug']})
+            user_client.get(f'/api/v1/titles/{response.json()["id"]}/')
+        catalog_queries = [
+            query for query in context.captured_queries
+            if 'FROM "titles_category"' in query['sql'] or '"titles_genre"."slug"' in query['sql']
+        ]
+        assert response.status_code == 201 and not catalog_queries, (
+            'Проверьте, что категории и жанры берутся из кэша процесса при записи, фильтрации и выводе произведений'
+        )
+        assert response.json()['category'] == categories[1] and response.json()['genre'] == [genres[0]]
+
+        category = Category.objects.get(slug=categories[1]['slug'])
+        category.name = 'Новое название'
+        category.save()
+        response = user_client.get(f'/api/v1/titles/{response.json()["id"]}/')
+        assert response.json()['category']['name'] == 'Новое название', (
+            'Проверьте, что кэш категорий сбрасывается при изменении категории'
+        )
+        user_client.post('/api/v1/genres/', data={'name': 'Триллер', 'slug': 'thriller'})
+        data = {'name': 'Ещё проект', 'year': 2000, 'genre': ['thriller'], 'category': categories[1]['slug']}
+        response = user_client.post('/api/v1/titles/', data=data)
+        assert response.status_code == 201 and response.json()['genre'] == [{'name': 'Триллер', 'slug': 'thriller'}], (
+            'Проверьте, что новые жанры сразу доступны при создании произведения'
+        )
+        user_client.delete('/api/v1/genres/thriller/')
+        response = user_client.get('/api/v1/titles/', {'genre': 'thriller'})
+        assert response.json()['count'] == 0
+        data['name'] = 'Последний проект'
+        response = user_client.post('/api/v1/titles/', data=data)
+        assert response.status_code == 400, (
+            'Проверьте, что удалённые жанры нельзя указать при создании произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_conditional_get_missing_title(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        response = client.get('/api/v1/titles/999999/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 404, (
+            'Проверьте, что GET запрос несуществующего произведения с `If-None-Match: *` возвращает статус 404'
+        )
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        last_modified = response['Last-Modified']
+        response = client.get('/api/v1/titles/999999/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 404, (
+            'Проверьте, что GET запрос несуществующего произведения с `If-Modified-Since` возвращает статус 404'
+        )
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 304
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304 and len(context) == 0, (
+            'Проверьте, что повторный ответ 304 на GET запрос `/api/v1/titles/{title_id}/` берётся из кеша'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_local_cache_state_expires(self, client, user_client, settings):
+        titles, categories, _ = create_titles(user_client)
+        settings.RESPONSE_CACHE_TIMEOUT = 1
+        cache.clear()
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        etag = response['ETag']
+        Category.objects.filter(slug=titles[0]['category']).update(name='Переименовано')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        time.sleep(1.1)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json()['category']['name'] == 'Переименовано', (
+            'Проверьте, что при локальном кэше процесса версия кэша и справочник категорий '
+            'устаревают не позже чем через `RESPONSE_CACHE_TIMEOUT`'
+        )
@@ -0,0 +1,89 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from titles.models import Review, SearchDocument, SearchTerm, Title
+
+from .common import create_reviews
+
+
+class Test08SearchAPI:
+
+    def search(self, client, text):
+        response = client.get('/api/v1/search/', {'q': text})
+        assert response.status_code == 200, (
+            'Проверьте, что GET запрос `/api/v1/search/` возвращает статус 200'
+        )
+        return response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search(self, client, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        data = self.search(client, 'пике')
+        assert 'count' in data and 'results' in data, (
+            'Проверьте, что GET запрос `/api/v1/search/` возвращает данные с пагинацией'
+        )
+        assert [title['id'] for title in data['results']] == [titles[0]['id']], (
+            'Проверьте, что `/api/v1/search/` ищет по описанию произведения'
+        )
+        assert data['results'][0]['rank'] > 0
+        data = self.search(client, 'QWERTY123')
+        assert [title['id'] for title in data['results']] == [titles[0]['id']], (
+            'Проверьте, что `/api/v1/search/` ищет по тексту отзывов без учёта регистра'
+        )
+        data = self.search(client, 'главная драма')
+        assert [title['id'] for title in data['results']] == [titles[1]['id']], (
+            'Проверьте, что `/api/v1/search/` находит произведения, содержащие все слова запроса'
+        )
+        assert self.search(client, '')['count'] == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_ranking_and_updates(self, client, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        user_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/', data={'text': 'Проект года', 'score': 5})
+        data = self.search(client, 'проект')
+        assert [title['id'] for title in data['results']] == [titles[1]['id']]
+        user_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'description': 'Проект века'})
+        data = self.search(client, 'проект')
+        assert [title['id'] for title in data['results']] == [titles[1]['id'], titles[0]['id']], (
+            'Проверьте, что совпадение в названии ранжируется выше совпадения в описании '
+            'и индекс обновляется при изменении произведения'
+        )
+        user_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/')
+        assert self.search(client, 'qwerty123')['count'] == 0, (
+            'Проверьте, что индекс обновляется при удалении отзыва'
+        )
+        SearchTerm.objects.all().delete()
+        call_command('rebuild_search_index')
+        assert self.search(client, 'qwerty321')['count'] == 1, (
+            'Проверьте, что команда `rebuild_search_index` восстанавливает поисковый индекс'
+        )
+
+    def search_queries(self, queries):
+        tables = (SearchTerm._meta.db_table, SearchDocument._meta.db_table)
+        return [query for query in queries if any(table in query['sql'] for table in tables)]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_index_batched_per_transaction(self, client, user_client, admin, django_user_model):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        counts = []
+        for title, stop in zip(titles, (2, 12)):
+            with CaptureQueriesContext(connection) as queries:
+                with transaction.atomic():
+                    for number in range(stop):
+                        author = django_user_model.objects.create(
+                            username=f'reader{title["id"]}_{number}', email=f'reader{title["id"]}_{number}@yamdb.fake')
+                        Review.objects.create(
+                            title_id=title['id'], author=author, text=f'Импорт{number}', score=5)
+            counts.append(len(self.search_queries(queries)))
+        assert counts[0] == counts[1] > 0, (
+            'Проверьте, что поисковый индекс произведения перестраивается один раз за транзакцию'
+        )
+        assert self.search(client, 'импорт11')['count'] == 1
+        with CaptureQueriesContext(connection) as queries:
+            Title.objects.filter(pk=titles[1]['id']).delete()
+        assert queries[-1]['sql'].startswith(f'DELETE FROM "{Title._meta.db_table}"'), (
+            'Проверьте, что удалённое произведение не переиндексируется после удаления'
+        )
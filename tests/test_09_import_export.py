@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+import os
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from titles.models import Comment, Review, Title
+
+from .common import auth_client, create_reviews
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+
+
+def read_rows(name):
+    with open(os.path.join(DATA_DIR, name), encoding='utf-8', newline='') as source:
+        return list(csv.DictReader(source))
+
+
+class Test09ImportExport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_import_csv(self, client, user_client, django_user_model):
+        user_ids = set(django_user_model.objects.values_list('id', flat=True))
+        call_command('import_csv', batch_size=7)
+        users = [row for row in read_rows('users.csv') if int(row['id']) not in user_ids]
+        assert django_user_model.objects.count() == len(users) + len(user_ids), (
+            'Проверьте, что команда `import_csv` пропускает пользователей с уже занятым id'
+        )
+        title_ids = {}
+        for row in read_rows('titles.csv'):
+            title_ids.setdefault(row['name'], row['id'])
+        title_ids = set(title_ids.values())
+        assert set(map(str, Title.objects.values_list('id', flat=True))) == title_ids, (
+            'Проверьте, что команда `import_csv` пропускает произведения с повторяющимся названием'
+        )
+        reviews = {}
+        for row in read_rows('review.csv'):
+            if row['title_id'] in title_ids:
+                reviews.setdefault((row['title_id'], row['author']), row)
+        reviews = list(reviews.values())
+        assert Review.objects.count() == len(reviews), (
+            'Проверьте, что команда `import_csv` пропускает отзывы к незагруженным произведениям и повторные отзывы'
+        )
+        review_ids = {row['id'] for row in reviews}
+        comments = [row for row in read_rows('comments.csv') if row['review_id'] in review_ids]
+        assert Comment.objects.count() == len(comments)
+        genre_titles = [row for row in read_rows('genre_title.csv') if row['title_id'] in title_ids]
+        assert Title.genre.through.objects.count() == len(genre_titles)
+
+        review = Review.objects.get(pk=1)
+        assert review.author_id == 100 and review.pub_date.year == 2019, (
+            'Проверьте, что команда `import_csv` сохраняет автора и дату публикации отзыва'
+        )
+        title = Title.objects.get(pk=1)
+        scores = list(title.reviews.values_list('score', flat=True))
+        response = client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.json()['rating'] == pytest.approx(sum(scores) / len(scores)), (
+            'Проверьте, что после команды `import_csv` пересчитываются рейтинги'
+        )
+        response = client.get('/api/v1/search/', {'q': title.name})
+        assert title.pk in [result['id'] for result in response.json()['results']], (
+            'Проверьте, что после команды `import_csv` строится поисковый индекс'
+        )
+        response = user_client.post('/api/v1/categories/', data={'name': 'Комиксы', 'slug': 'comics'})
+        assert response.status_code == 201, (
+            'Проверьте, что после команды `import_csv` можно создавать новые объекты'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export(self, user_client, admin):
+        reviews, titles, user, _ = create_reviews(user_client, admin)
+        response = auth_client(user).get('/api/v1/export/reviews/')
+        assert response.status_code == 403, (
+            'Проверьте, что выгрузка доступна только администратору'
+        )
+        response = user_client.get('/api/v1/export/reviews/', HTTP_ACCEPT='application/x-ndjson')
+        assert response.status_code == 200 and response.streaming, (
+            'Проверьте, что `/api/v1/export/{dataset}/` отдаёт потоковый ответ'
+        )
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert [row['id'] for row in rows] == sorted(review['id'] for review in reviews), (
+            'Проверьте, что выгрузка в NDJSON содержит все отзывы, упорядоченные по id'
+        )
+        assert set(rows[0]) == {'id', 'title_id', 'text', 'author', 'score', 'pub_date'} and rows[0]['pub_date'].endswith('Z')
+
+        response = user_client.get('/api/v1/export/titles/', {'output': 'csv'})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert list(rows[0]) == ['id', 'name', 'year', 'category', 'rating'], (
+            'Проверьте, что выгрузка в CSV использует колонки файлов data/*.csv и добавляет рейтинг'
+        )
+        assert len(rows) == len(titles) and rows[0]['rating'] == '4.0'
+        response = user_client.get('/api/v1/export/titles/', {'output': 'xml'})
+        assert response.status_code == 400
+        response = user_client.get('/api/v1/export/users/')
+        assert response.status_code == 404
+
+        stdout = io.StringIO()
+        call_command('export', 'reviews', output='csv', chunk_size=2, stdout=stdout)
+        assert stdout.getvalue() == b''.join(
+            user_client.get('/api/v1/export/reviews/', {'output': 'csv'}).streaming_content
+        ).decode(), (
+            'Проверьте, что команда `export` выдаёт то же, что и эндпоинт выгрузки'
+        )
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Category, Comment, CustomUser, Genre, Review, Title
+from .models import (
+    Category, Comment, CustomUser, EmailOutbox, Genre, Review, Title,
+)
 
 admin.site.register(CustomUser)
 admin.site.register(Comment)
@@ -8,3 +10,4 @@ admin.site.register(Title)
 admin.site.register(Review)
 admin.site.register(Genre)
 admin.site.register(Category)
+admin.site.register(EmailOutbox)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TitlesConfig(AppConfig):
     name = 'titles'
+
+    def ready(self):
+        import titles.signals  # noqa: F401
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from titles.models import UNCONFIRMED_USER, ConfirmationCode
+
+
+def delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        queryset.model.objects.filter(pk__in=batch).delete()
+        deleted += len(batch)
+
+
+class Command(BaseCommand):
+    help = ('Удаляет просроченные коды подтверждения и так и не '
+            'подтверждённые учётные записи')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей удалять за один запрос')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options['batch_size']
+        codes = delete_in_batches(
+            ConfirmationCode.objects.stale(now), batch_size)
+        pending = ConfirmationCode.objects.values('email')
+        users = get_user_model().objects.filter(
+            UNCONFIRMED_USER,
+            date_joined__lt=now - settings.CONFIRMATION_CODE_LIFETIME,
+        ).exclude(email__in=pending)
+        users = delete_in_batches(users, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено кодов подтверждения: {codes}, '
+            f'неподтверждённых пользователей: {users}'))
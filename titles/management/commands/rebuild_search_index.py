@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from titles.models import Title
+from titles.search import index_titles
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество произведений в одной пачке')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        title_ids = Title.objects.order_by('pk').values_list('pk', flat=True)
+        indexed = 0
+        batch = []
+        for pk in title_ids.iterator(chunk_size=batch_size):
+            batch.append(pk)
+            if len(batch) == batch_size:
+                indexed += index_titles(batch)
+                batch = []
+        if batch:
+            indexed += index_titles(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано произведений: {indexed}'))
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from titles.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди EmailOutbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.MAIL_WORKER_BATCH_SIZE,
+            help='Сколько писем отправлять за одно SMTP-соединение')
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.MAIL_WORKER_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться')
+
+    def drain(self, batch_size):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_outbox(batch_size)
+            total_sent += sent
+            total_failed += failed
+            if sent + failed < batch_size:
+                return total_sent, total_failed
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.drain(options['batch_size'])
+            if sent or failed or options['once']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Отправлено писем: {sent}, отложено: {failed}'))
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,61 @@
+# Generated by Django 3.0.5 on 2026-10-18 17:06
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+INDEX_NAME = 'titles_searchdocument_vector_gin'
+
+
+def create_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON titles_searchdocument USING gin (vector)'
+    )
+
+
+def drop_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0004_title_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='titles.Title', verbose_name='Произведение')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Термин')),
+                ('weight', models.FloatField(verbose_name='Вес')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='titles.Title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Поисковый термин',
+                'verbose_name_plural': 'Поисковые термины',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'title'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_vector_index, drop_vector_index),
+    ]
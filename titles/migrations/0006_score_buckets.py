@@ -0,0 +1,45 @@
+# Generated by Django 3.0.5 on 2026-10-18 17:28
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_score_buckets(apps, schema_editor):
+    Review = apps.get_model('titles', 'Review')
+    ScoreBucket = apps.get_model('titles', 'ScoreBucket')
+    reviews = Review.objects.order_by().values(
+        'title_id', 'score').annotate(total=Count('pk'))
+    ScoreBucket.objects.bulk_create(
+        ScoreBucket(
+            title_id=row['title_id'], score=row['score'], count=row['total'])
+        for row in reviews
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество отзывов')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='titles.Title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Столбец гистограммы оценок',
+                'verbose_name_plural': 'Гистограммы оценок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scorebucket',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique_score_bucket'),
+        ),
+        migrations.RunPython(fill_score_buckets, migrations.RunPython.noop),
+    ]
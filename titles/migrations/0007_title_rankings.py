@@ -0,0 +1,41 @@
+# Generated by Django 3.0.5 on 2026-10-18 17:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0006_score_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='titles.Title', verbose_name='Произведение')),
+                ('rating_sum', models.IntegerField(default=0, verbose_name='Сумма оценок')),
+                ('rating_count', models.IntegerField(default=0, verbose_name='Количество оценок')),
+                ('prior', models.FloatField(null=True, verbose_name='Средняя оценка по каталогу')),
+                ('bayesian', models.FloatField(default=0, verbose_name='Взвешенный рейтинг')),
+                ('trending', models.FloatField(default=0, verbose_name='Отзывов в день за последние дни')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Рейтинги произведений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-pub_date'], name='review_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['-bayesian', '-title'], name='ranking_bayesian_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['-trending', '-bayesian', '-title'], name='ranking_trending_idx'),
+        ),
+    ]
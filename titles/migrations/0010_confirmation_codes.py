@@ -0,0 +1,50 @@
+# Generated by Django 3.0.5 on 2026-10-18 17:38
+
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def move_legacy_codes(apps, schema_editor):
+    CustomUser = apps.get_model('titles', 'CustomUser')
+    ConfirmationCode = apps.get_model('titles', 'ConfirmationCode')
+    expires_at = timezone.now() + settings.CONFIRMATION_CODE_LIFETIME
+    users = CustomUser.objects.exclude(password='').exclude(
+        password__contains='$').exclude(password__startswith='!')
+    for user in users.iterator():
+        ConfirmationCode.objects.update_or_create(email=user.email, defaults={
+            'code_hash': hmac.new(
+                settings.SECRET_KEY.encode(), user.password.encode(),
+                hashlib.sha256).hexdigest(),
+            'expires_at': expires_at,
+        })
+        user.password = make_password(None)
+        user.save(update_fields=['password'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0009_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmationCode',
+            fields=[
+                ('email', models.EmailField(max_length=254, primary_key=True, serialize=False, verbose_name='Адрес электронной почты')),
+                ('code_hash', models.CharField(max_length=64, verbose_name='Хеш кода')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток')),
+            ],
+            options={
+                'verbose_name': 'Код подтверждения',
+                'verbose_name_plural': 'Коды подтверждения',
+            },
+        ),
+        migrations.RunPython(move_legacy_codes, migrations.RunPython.noop),
+    ]
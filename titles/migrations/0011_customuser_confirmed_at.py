@@ -0,0 +1,36 @@
+# Generated by Django 3.0.5 on 2026-10-18 17:53
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_pending_signups(apps, schema_editor):
+    CustomUser = apps.get_model('titles', 'CustomUser')
+    ConfirmationCode = apps.get_model('titles', 'ConfirmationCode')
+    CustomUser.objects.update(confirmed_at=F('date_joined'))
+    CustomUser.objects.filter(
+        is_active=False,
+        last_login__isnull=True,
+        date_joined__gte=(
+            django.utils.timezone.now()
+            - settings.CONFIRMATION_CODE_LIFETIME),
+        email__in=ConfirmationCode.objects.values('email'),
+    ).update(confirmed_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0010_confirmation_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True, verbose_name='Дата подтверждения email'),
+        ),
+        migrations.RunPython(mark_pending_signups, migrations.RunPython.noop),
+    ]
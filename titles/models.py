@@ -1,9 +1,23 @@
+import hashlib
+import hmac
+import secrets
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Avg, Count, F, OuterRef, Prefetch, Q, Subquery, Sum,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 
 from titles.validators import year_validator
 
+UNCONFIRMED_USER = Q(confirmed_at__isnull=True)
+RATING_FIELDS = ('rating_sum', 'rating_count', 'rating')
+
 
 class CustomUser(AbstractUser):
     USER = 'user'
@@ -21,6 +35,11 @@ class CustomUser(AbstractUser):
     role = models.CharField(
         'Права', max_length=10, choices=ROLES, default=USER)
     bio = models.TextField('О себе', null=True, blank=True)
+    token_version = models.PositiveIntegerField(
+        'Версия токенов', default=0, editable=False)
+    confirmed_at = models.DateTimeField(
+        'Дата подтверждения email', null=True, blank=True,
+        default=timezone.now)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username',)
@@ -68,6 +87,45 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def with_genre_ids(self):
+        return self.prefetch_related(
+            Prefetch('genre', queryset=Genre.objects.only('id')))
+
+    def add_score(self, score, count):
+        rating_sum = F('rating_sum') + score
+        rating_count = F('rating_count') + count
+        return self.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=(
+                Cast(rating_sum, models.FloatField())
+                / Cast(NullIf(rating_count, 0), models.FloatField())
+            ),
+        )
+
+    def recalculate_ratings(self):
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0,
+                output_field=models.IntegerField(),
+            ),
+            rating_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('pk')).values('total')),
+                0,
+                output_field=models.IntegerField(),
+            ),
+            rating=Subquery(
+                reviews.annotate(average=Avg('score')).values('average'),
+                output_field=models.FloatField(),
+            ),
+        )
+
+
 class Title(models.Model):
     name = models.CharField(
         max_length=100,
@@ -96,6 +154,24 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Категория произведения',
     )
+    rating_sum = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок',
+    )
+    rating_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество оценок',
+    )
+    rating = models.FloatField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Рейтинг',
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id', ]
@@ -105,6 +181,15 @@ class Title(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and (
+                kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -133,7 +218,14 @@ class Review(models.Model):
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx',
+            ),
+            models.Index(fields=['-pub_date'], name='review_pub_date_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -146,6 +238,72 @@ class Review(models.Model):
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'title_id', 'score'} <= instance.__dict__.keys():
+            instance._loaded_rating = (instance.title_id, instance.score)
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ScoreBucketQuerySet(models.QuerySet):
+
+    def add(self, title_id, score, count):
+        buckets = self.filter(title_id=title_id, score=score)
+        if buckets.update(count=F('count') + count) or count < 0:
+            return
+        try:
+            with transaction.atomic():
+                self.create(title_id=title_id, score=score, count=count)
+        except IntegrityError:
+            buckets.update(count=F('count') + count)
+
+    def rebuild(self, title_ids=None):
+        reviews = Review.objects.order_by().values(
+            'title_id', 'score').annotate(total=Count('pk'))
+        buckets = self.all()
+        if title_ids is not None:
+            reviews = reviews.filter(title_id__in=title_ids)
+            buckets = buckets.filter(title_id__in=title_ids)
+        with transaction.atomic():
+            buckets.delete()
+            self.bulk_create(
+                self.model(
+                    title_id=row['title_id'],
+                    score=row['score'],
+                    count=row['total'],
+                )
+                for row in reviews
+            )
+
+
+class ScoreBucket(models.Model):
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='score_buckets',
+        verbose_name='Произведение',
+    )
+    score = models.PositiveSmallIntegerField(verbose_name='Оценка')
+    count = models.IntegerField(
+        default=0, verbose_name='Количество отзывов')
+
+    objects = ScoreBucketQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'score'],
+                name='unique_score_bucket',
+            )
+        ]
+        verbose_name = 'Столбец гистограммы оценок'
+        verbose_name_plural = 'Гистограммы оценок'
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -165,9 +323,193 @@ class Comment(models.Model):
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx',
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text[:15]
+
+
+class SearchDocument(models.Model):
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+        verbose_name='Произведение',
+    )
+    vector = SearchVectorField(null=True)
+
+    class Meta:
+        verbose_name = 'Поисковый документ'
+        verbose_name_plural = 'Поисковые документы'
+
+
+class SearchTerm(models.Model):
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Произведение',
+    )
+    term = models.CharField(max_length=64, verbose_name='Термин')
+    weight = models.FloatField(verbose_name='Вес')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'title'],
+                name='unique_search_term',
+            )
+        ]
+        verbose_name = 'Поисковый термин'
+        verbose_name_plural = 'Поисковые термины'
+
+    def __str__(self):
+        return self.term
+
+
+class TitleRanking(models.Model):
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Произведение',
+    )
+    rating_sum = models.IntegerField(default=0, verbose_name='Сумма оценок')
+    rating_count = models.IntegerField(
+        default=0, verbose_name='Количество оценок')
+    prior = models.FloatField(
+        null=True, verbose_name='Средняя оценка по каталогу')
+    bayesian = models.FloatField(default=0, verbose_name='Взвешенный рейтинг')
+    trending = models.FloatField(
+        default=0, verbose_name='Отзывов в день за последние дни')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-bayesian', '-title'],
+                name='ranking_bayesian_idx',
+            ),
+            models.Index(
+                fields=['-trending', '-bayesian', '-title'],
+                name='ranking_trending_idx',
+            ),
+        ]
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Рейтинги произведений'
+
+
+class EmailOutboxQuerySet(models.QuerySet):
+
+    def enqueue(self, subject, body, from_email, recipient):
+        return self.create(
+            subject=subject,
+            body=body,
+            from_email=from_email,
+            recipient=recipient,
+        )
+
+    def due(self, now):
+        return self.filter(
+            sent_at__isnull=True, next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id')
+
+
+class EmailOutbox(models.Model):
+    subject = models.CharField(max_length=200, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст письма')
+    from_email = models.EmailField(verbose_name='Отправитель')
+    recipient = models.EmailField(verbose_name='Получатель')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата постановки в очередь')
+    next_attempt_at = models.DateTimeField(
+        null=True, default=timezone.now,
+        verbose_name='Следующая попытка отправки')
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток отправки')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    sent_at = models.DateTimeField(null=True, verbose_name='Дата отправки')
+
+    objects = EmailOutboxQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                name='outbox_due_idx',
+                condition=Q(sent_at__isnull=True),
+            ),
+        ]
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
+
+
+def hash_confirmation_code(code):
+    return hmac.new(
+        settings.SECRET_KEY.encode(), code.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+class ConfirmationCodeQuerySet(models.QuerySet):
+
+    def issue(self, email, now=None):
+        code = secrets.token_urlsafe(15)
+        now = now or timezone.now()
+        self.update_or_create(email=email, defaults={
+            'code_hash': hash_confirmation_code(code),
+            'expires_at': now + settings.CONFIRMATION_CODE_LIFETIME,
+            'attempts': 0,
+        })
+        return code
+
+    def verify(self, email, code, now=None):
+        codes = self.filter(
+            email=email,
+            expires_at__gt=now or timezone.now(),
+            attempts__lt=settings.CONFIRMATION_CODE_MAX_ATTEMPTS,
+        )
+        code_hash = codes.values_list('code_hash', flat=True).first()
+        if code_hash is None:
+            return False
+        if not hmac.compare_digest(code_hash, hash_confirmation_code(code)):
+            codes.update(attempts=F('attempts') + 1)
+            return False
+        deleted, _ = codes.filter(code_hash=code_hash).delete()
+        return bool(deleted)
+
+    def stale(self, now):
+        return self.filter(
+            Q(expires_at__lte=now)
+            | Q(attempts__gte=settings.CONFIRMATION_CODE_MAX_ATTEMPTS)
+        )
+
+
+class ConfirmationCode(models.Model):
+    email = models.EmailField(
+        primary_key=True, verbose_name='Адрес электронной почты')
+    code_hash = models.CharField(max_length=64, verbose_name='Хеш кода')
+    expires_at = models.DateTimeField(
+        db_index=True, verbose_name='Действует до')
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Неудачных попыток')
+
+    objects = ConfirmationCodeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self):
+        return self.email
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+
+def get_retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.MAIL_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.MAIL_RETRY_MAX_DELAY,
+    ))
+
+
+def schedule_retry(letter, error, now):
+    letter.attempts += 1
+    letter.last_error = f'{type(error).__name__}: {error}'
+    if letter.attempts >= settings.MAIL_MAX_ATTEMPTS:
+        letter.next_attempt_at = None
+    else:
+        letter.next_attempt_at = now + get_retry_delay(letter.attempts)
+
+
+def send_letters(letters, now):
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        for letter in letters:
+            schedule_retry(letter, error, now)
+        return 0
+    sent = 0
+    try:
+        for letter in letters:
+            message = EmailMessage(
+                letter.subject, letter.body, letter.from_email,
+                [letter.recipient], connection=connection)
+            try:
+                message.send()
+            except Exception as error:
+                schedule_retry(letter, error, now)
+            else:
+                letter.attempts += 1
+                letter.sent_at = now
+                sent += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def deliver_outbox(batch_size=None, now=None):
+    batch_size = batch_size or settings.MAIL_WORKER_BATCH_SIZE
+    now = now or timezone.now()
+    with transaction.atomic():
+        letters = list(EmailOutbox.objects.due(now).select_for_update(
+            skip_locked=True)[:batch_size])
+        if not letters:
+            return 0, 0
+        sent = send_letters(letters, now)
+        EmailOutbox.objects.bulk_update(
+            letters,
+            ['attempts', 'last_error', 'next_attempt_at', 'sent_at'],
+        )
+    return sent, len(letters) - sent
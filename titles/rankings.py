@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q,
+    Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import Review, Title, TitleRanking
+
+
+def get_prior():
+    totals = Title.objects.aggregate(
+        rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'))
+    if not totals['rating_count']:
+        return 0.0
+    return round(totals['rating_sum'] / totals['rating_count'], 2)
+
+
+def add_missing_rankings():
+    missing = Title.objects.filter(ranking__isnull=True).values_list(
+        'pk', flat=True)
+    TitleRanking.objects.bulk_create(
+        [TitleRanking(title_id=pk) for pk in missing],
+        ignore_conflicts=True,
+    )
+
+
+def refresh_bayesian(prior):
+    weight = settings.RANKING_PRIOR_WEIGHT
+    title = Title.objects.filter(pk=OuterRef('title_id'))
+    rating_sum = Subquery(title.values('rating_sum'))
+    rating_count = Subquery(title.values('rating_count'))
+    stale = TitleRanking.objects.exclude(
+        rating_sum=F('title__rating_sum'),
+        rating_count=F('title__rating_count'),
+        prior=prior,
+    )
+    return stale.update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        prior=prior,
+        bayesian=ExpressionWrapper(
+            (Value(prior * weight) + rating_sum)
+            / (Value(float(weight)) + rating_count),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def refresh_trending(now):
+    days = settings.RANKING_TRENDING_DAYS
+    recent = Review.objects.filter(pub_date__gte=now - timedelta(days=days))
+    counts = recent.filter(title=OuterRef('title_id')).order_by().values(
+        'title').annotate(total=Count('pk')).values('total')
+    active = TitleRanking.objects.filter(
+        Q(title_id__in=recent.values('title_id')) | Q(trending__gt=0))
+    return active.update(
+        trending=Cast(
+            Coalesce(Subquery(counts), 0, output_field=IntegerField()),
+            FloatField(),
+        ) / days,
+    )
+
+
+def refresh_rankings(now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        add_missing_rankings()
+        return refresh_bayesian(get_prior()), refresh_trending(now)
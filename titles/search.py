@@ -0,0 +1,99 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector,
+)
+from django.db import connection
+from django.db.models import Count, F, Sum, TextField, Value
+
+from .models import Review, SearchDocument, SearchTerm, Title
+
+TOKEN_RE = re.compile(r'\w{2,}')
+TERM_MAX_LENGTH = SearchTerm._meta.get_field('term').max_length
+FIELD_WEIGHTS = {'name': 1.0, 'description': 0.4, 'reviews': 0.1}
+
+
+def tokenize(text):
+    return [
+        token[:TERM_MAX_LENGTH] for token in TOKEN_RE.findall(text.lower())
+    ]
+
+
+def get_documents(title_ids):
+    documents = {}
+    titles = Title.objects.filter(pk__in=title_ids).values_list(
+        'pk', 'name', 'description')
+    for pk, name, description in titles:
+        reviews = Review.objects.filter(title_id=pk).order_by(
+            '-pub_date', '-id')
+        documents[pk] = {
+            'name': name,
+            'description': description,
+            'reviews': ' '.join(reviews.values_list(
+                'text', flat=True)[:settings.SEARCH_MAX_REVIEWS]),
+        }
+    return documents
+
+
+def weighted_vector(text, weight):
+    return SearchVector(
+        Value(text, output_field=TextField()),
+        weight=weight,
+        config=settings.SEARCH_CONFIG,
+    )
+
+
+def update_vectors(documents):
+    SearchDocument.objects.bulk_create(
+        [SearchDocument(title_id=pk) for pk in documents],
+        ignore_conflicts=True,
+    )
+    for pk, document in documents.items():
+        SearchDocument.objects.filter(title_id=pk).update(vector=(
+            weighted_vector(document['name'], 'A')
+            + weighted_vector(document['description'], 'B')
+            + weighted_vector(document['reviews'], 'C')
+        ))
+
+
+def update_terms(documents):
+    SearchTerm.objects.filter(title_id__in=list(documents)).delete()
+    terms = []
+    for pk, document in documents.items():
+        weights = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(document[field]):
+                weights[token] += weight
+        terms.extend(
+            SearchTerm(title_id=pk, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    SearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def index_titles(title_ids):
+    documents = get_documents(title_ids)
+    if connection.vendor == 'postgresql':
+        update_vectors(documents)
+    else:
+        update_terms(documents)
+    return len(documents)
+
+
+def search_titles(text, queryset=None):
+    if queryset is None:
+        queryset = Title.objects.all()
+    terms = set(tokenize(text))
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=settings.SEARCH_CONFIG)
+        return queryset.filter(search_document__vector=query).annotate(
+            rank=SearchRank(F('search_document__vector'), query),
+        ).order_by('-rank', '-id')
+    return queryset.filter(search_terms__term__in=terms).annotate(
+        matched=Count('search_terms'),
+        rank=Sum('search_terms__weight'),
+    ).filter(matched=len(terms)).order_by('-rank', '-id')
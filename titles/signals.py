@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Review, ScoreBucket, Title
+from .search import index_titles
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    titles = Title.objects.filter(pk=instance.title_id)
+    loaded = getattr(instance, '_loaded_rating', None)
+    if created:
+        titles.add_score(instance.score, 1)
+        ScoreBucket.objects.add(instance.title_id, instance.score, 1)
+    elif loaded is None:
+        titles.recalculate_ratings()
+        ScoreBucket.objects.rebuild([instance.title_id])
+    elif loaded[0] == instance.title_id:
+        if loaded[1] != instance.score:
+            titles.add_score(instance.score - loaded[1], 0)
+            ScoreBucket.objects.add(loaded[0], loaded[1], -1)
+            ScoreBucket.objects.add(instance.title_id, instance.score, 1)
+    else:
+        Title.objects.filter(pk=loaded[0]).add_score(-loaded[1], -1)
+        titles.add_score(instance.score, 1)
+        ScoreBucket.objects.add(loaded[0], loaded[1], -1)
+        ScoreBucket.objects.add(instance.title_id, instance.score, 1)
+    instance._loaded_rating = (instance.title_id, instance.score)
+
+
+class TitleChanges:
+    def __init__(self):
+        self.deleted = set()
+        self.reindexed = set()
+
+    def __call__(self):
+        title_ids = self.reindexed - self.deleted
+        if title_ids:
+            index_titles(sorted(title_ids))
+
+
+def get_title_changes():
+    connection = transaction.get_connection()
+    for entry in connection.run_on_commit:
+        if isinstance(entry[1], TitleChanges):
+            return entry[1]
+    changes = TitleChanges()
+    if connection.in_atomic_block:
+        transaction.on_commit(changes)
+    return changes
+
+
+def reindex_title(title_id):
+    if transaction.get_connection().in_atomic_block:
+        get_title_changes().reindexed.add(title_id)
+    else:
+        index_titles([title_id])
+
+
+@receiver(pre_delete, sender=Title)
+def mark_title_deleted(sender, instance, **kwargs):
+    get_title_changes().deleted.add(instance.pk)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    if instance.title_id in get_title_changes().deleted:
+        return
+    Title.objects.filter(pk=instance.title_id).add_score(-instance.score, -1)
+    ScoreBucket.objects.add(instance.title_id, instance.score, -1)
+
+
+@receiver(post_save, sender=Title)
+def update_search_index_on_title_save(sender, instance, raw, **kwargs):
+    if not raw:
+        reindex_title(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_search_index_on_review_change(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        reindex_title(instance.title_id)